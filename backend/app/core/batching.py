@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+class BatchingProxy:
+    """Coalesce concurrent single-key lookups into one batched backend call
+    
+    Keys requested within flush_interval seconds (or until max_batch_size distinct
+    keys are waiting) are resolved by a single batch_fn(keys) call returning a
+    dict of key -> value. Keys missing from the result resolve to None.
+    """
+    
+    def __init__(self, batch_fn: Callable[[List[Any]], Awaitable[Dict[Any, Any]]],
+                 max_batch_size: int = 64, flush_interval: float = 0.005):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._pending: Dict[Any, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.Task] = None
+        # Strong references to size-triggered flushes until they finish
+        self._flush_tasks: Set[asyncio.Task] = set()
+    
+    async def load(self, key: Any) -> Any:
+        """Resolve one key as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+        
+        if len(self._pending) >= self.max_batch_size:
+            task = loop.create_task(self._flush(self._take_pending()))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        elif self._timer is None:
+            self._timer = loop.create_task(self._flush_after_interval())
+        
+        return await future
+    
+    def _take_pending(self) -> Dict[Any, List[asyncio.Future]]:
+        """Detach the waiting keys so new requests start the next batch"""
+        pending, self._pending = self._pending, {}
+        return pending
+    
+    async def _flush_after_interval(self):
+        """Flush whatever accumulated during the batching window"""
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        if self._pending:
+            await self._flush(self._take_pending())
+    
+    async def _flush(self, pending: Dict[Any, List[asyncio.Future]]):
+        """Issue one batched call and fan the results back out to the waiters"""
+        try:
+            results = await self.batch_fn(list(pending))
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        for key, futures in pending.items():
+            value = results.get(key)
+            for future in futures:
+                if not future.done():
+                    future.set_result(value)
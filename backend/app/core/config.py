@@ -17,10 +17,20 @@ class Settings(BaseSettings):
     # OpenAI
     openai_api_key: Optional[str] = None
     
+    # Embeddings
+    embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_dimensions: int = 384
+    
     # Application
     app_host: str = "0.0.0.0"
     app_port: int = 8000
     debug: bool = True
+    log_level: str = "INFO"
+    
+    @property
+    def async_database_url(self) -> str:
+        """database_url rewritten for the asyncpg driver"""
+        return self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
     
     class Config:
         env_file = ".env"
@@ -1,11 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 from .config import settings
 
 engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Async engine (asyncpg) for write-heavy paths that must not block the event loop
+async_engine = create_async_engine(settings.async_database_url)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -19,6 +25,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency to get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 @contextmanager
 def get_db_session():
     """Context manager to get database session for WebSocket and background tasks"""
@@ -35,9 +47,16 @@ def create_tables():
         # Import models to register them with Base
         from app.models.database import (
             Customer, Conversation, Message, Interaction, 
-            Document, ConversationMemory
+            Document, ConversationMemory, MemoryTag
         )
+        # pgvector must be installed before the documents.embedding column is created
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         Base.metadata.create_all(bind=engine)
+        upgrade_existing_tables()
+        backfill_memory_tags()
+        backfill_summary_columns()
+        backfill_document_token_counts()
         print("Database tables created successfully")
         return True
     except Exception as e:
@@ -45,6 +64,81 @@ def create_tables():
         return False
 
 
+def upgrade_existing_tables():
+    """Add model columns and indexes missing from tables created by an older schema
+    
+    create_all skips tables that already exist, so new columns would otherwise never
+    reach a deployed database. Safe to run on every startup.
+    """
+    with engine.begin() as conn:
+        existing = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not existing.has_table(table.name):
+                continue
+            present = {column["name"] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                # Renders the type and any GENERATED ... STORED expression from the model
+                ddl = str(CreateColumn(column).compile(dialect=conn.dialect))
+                for fk in column.foreign_keys:
+                    ddl += f" REFERENCES {fk.column.table.name} ({fk.column.name})"
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {ddl}"))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def backfill_summary_columns():
+    """Fill denormalized message/conversation columns for rows written before they existed"""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE messages m SET customer_id = c.customer_id
+            FROM conversations c
+            WHERE m.conversation_id = c.id AND m.customer_id IS NULL
+        """))
+        conn.execute(text("""
+            UPDATE conversations c SET
+                message_count = (SELECT count(*) FROM messages m WHERE m.conversation_id = c.id),
+                first_user_msg = (SELECT left(m.content, 100) FROM messages m
+                                  WHERE m.conversation_id = c.id AND m.message_type = 'user'
+                                  ORDER BY m.id LIMIT 1),
+                last_assistant_msg = (SELECT left(m.content, 100) FROM messages m
+                                      WHERE m.conversation_id = c.id AND m.message_type = 'assistant'
+                                      ORDER BY m.id DESC LIMIT 1)
+            WHERE c.message_count IS NULL
+        """))
+
+
+def backfill_document_token_counts():
+    """Count keywords for documents ingested before token_count was stored"""
+    from app.services.rag import rag_service
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, title, content FROM documents WHERE token_count IS NULL"
+        )).all()
+        if rows:
+            counts = rag_service._extract_keywords_batch([f"{title} {content}" for _, title, content in rows])
+            conn.execute(
+                text("UPDATE documents SET token_count = :token_count WHERE id = :id"),
+                [{"id": row.id, "token_count": len(keywords)} for row, keywords in zip(rows, counts)]
+            )
+
+
+def backfill_memory_tags():
+    """Normalize comma-separated memory tags that have no memory_tags rows yet"""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO memory_tags (memory_id, tag)
+            SELECT DISTINCT cm.id, trim(t.tag)
+            FROM conversation_memory cm
+            CROSS JOIN LATERAL unnest(string_to_array(cm.tags, ',')) AS t(tag)
+            WHERE cm.tags IS NOT NULL
+              AND trim(t.tag) <> ''
+              AND NOT EXISTS (SELECT 1 FROM memory_tags mt WHERE mt.memory_id = cm.id)
+            ON CONFLICT DO NOTHING
+        """))
+
+
 def test_connection():
     """Test database connection"""
     try:
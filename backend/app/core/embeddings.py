@@ -0,0 +1,45 @@
+from typing import Optional, List
+from .config import settings
+
+
+class EmbeddingClient:
+    def __init__(self):
+        self.model = None
+        self.dimensions = settings.embedding_dimensions
+    
+    def _load_model(self):
+        """Load the sentence-transformers model on first use"""
+        if self.model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer(settings.embedding_model)
+            except Exception as e:
+                print(f"Embedding model load failed: {e}")
+        return self.model
+    
+    def encode(self, text: str) -> Optional[List[float]]:
+        """Embed text as a normalized vector for cosine similarity search"""
+        model = self._load_model()
+        if not model:
+            return None
+        
+        try:
+            return model.encode(text, normalize_embeddings=True).tolist()
+        except Exception as e:
+            print(f"Embedding generation failed: {e}")
+            return None
+    
+    def encode_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed many texts in one batched forward pass"""
+        model = self._load_model()
+        if not model or not texts:
+            return [None] * len(texts)
+        
+        try:
+            return model.encode(texts, normalize_embeddings=True).tolist()
+        except Exception as e:
+            print(f"Batch embedding generation failed: {e}")
+            return [None] * len(texts)
+
+
+embedding_client = EmbeddingClient()
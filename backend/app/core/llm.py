@@ -1,4 +1,5 @@
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI
 from .config import settings
 from typing import Optional
 
@@ -7,14 +8,20 @@ class LLMClient:
     def __init__(self):
         self.client = None
         if settings.openai_api_key:
-            self.client = OpenAI(api_key=settings.openai_api_key)
+            # One long-lived client so TLS connections are pooled across requests
+            self.client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+                )
+            )
     
-    def test_connection(self):
+    async def test_connection(self):
         """Test OpenAI API connection"""
         if not self.client:
             return False
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": "test"}],
                 max_tokens=1
@@ -24,13 +31,13 @@ class LLMClient:
             print(f"OpenAI API test failed: {e}")
             return False
     
-    def generate_response(self, messages: list, model: str = "gpt-3.5-turbo"):
+    async def generate_response(self, messages: list, model: str = "gpt-3.5-turbo"):
         """Generate response using OpenAI API"""
         if not self.client:
             raise Exception("OpenAI client not initialized")
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=model,
                 messages=messages
             )
@@ -38,6 +45,11 @@ class LLMClient:
         except Exception as e:
             print(f"Response generation failed: {e}")
             return None
+    
+    async def close(self):
+        """Close the pooled HTTP connections"""
+        if self.client:
+            await self.client.close()
 
 
-llm_client = LLMClient()
\ No newline at end of file
+llm_client = LLMClient()
@@ -0,0 +1,21 @@
+import logging
+from contextvars import ContextVar
+
+# Session bound once per request; asyncio tasks spawned afterwards inherit it
+SESSION_VAR: ContextVar[str] = ContextVar("session", default="")
+
+
+class SessionContextFilter(logging.Filter):
+    """Attach the current session id to every log record"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = SESSION_VAR.get()
+        return True
+
+
+def install_session_filter():
+    """Add the session filter to the root handlers and include it in their format"""
+    formatter = logging.Formatter("%(levelname)s:%(name)s:[%(session_id)s] %(message)s")
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(SessionContextFilter())
+        handler.setFormatter(formatter)
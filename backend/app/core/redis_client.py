@@ -1,13 +1,25 @@
 import redis.asyncio as redis
-import json
+import orjson
+import time
+import uuid
+import zstandard as zstd
+from redis.exceptions import ResponseError
 from typing import Optional, Dict, Any, Union
 from .config import settings
+from .serialization import dumps
+
+
+# Shared zstd contexts for large cached payloads (JSON text compresses ~4-6x)
+_cctx = zstd.ZstdCompressor(level=3)
+_dctx = zstd.ZstdDecompressor()
 
 
 class RedisClient:
     def __init__(self):
         self.pool = None
         self.client = None
+        self.binary_pool = None
+        self.binary_client = None
     
     async def connect(self):
         """Initialize Redis connection pool"""
@@ -19,6 +31,12 @@ class RedisClient:
                 max_connections=20
             )
             self.client = redis.Redis(connection_pool=self.pool)
+            # Compressed payloads are raw bytes and must skip response decoding
+            self.binary_pool = redis.ConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=20
+            )
+            self.binary_client = redis.Redis(connection_pool=self.binary_pool)
             return True
         except Exception as e:
             print(f"Redis connection failed: {e}")
@@ -30,6 +48,10 @@ class RedisClient:
             await self.client.close()
         if self.pool:
             await self.pool.disconnect()
+        if self.binary_client:
+            await self.binary_client.close()
+        if self.binary_pool:
+            await self.binary_pool.disconnect()
     
     async def test_connection(self):
         """Test Redis connection"""
@@ -43,20 +65,20 @@ class RedisClient:
             return False
     
     async def get(self, key: str) -> Optional[Any]:
-        """Get value from Redis with JSON deserialization"""
+        """Get value from Redis with JSON deserialization (orjson)"""
         try:
             value = await self.client.get(key)
             if value:
-                return json.loads(value)
+                return orjson.loads(value)
             return None
         except Exception as e:
             print(f"Redis get failed for key {key}: {e}")
             return None
     
     async def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
-        """Set value in Redis with JSON serialization"""
+        """Set value in Redis with JSON serialization (orjson)"""
         try:
-            json_value = json.dumps(value, default=str)
+            json_value = dumps(value)
             if expire:
                 await self.client.setex(key, expire, json_value)
             else:
@@ -66,6 +88,108 @@ class RedisClient:
             print(f"Redis set failed for key {key}: {e}")
             return False
     
+    async def set_many(self, items: Dict[str, Any], expire: Optional[int] = None) -> bool:
+        """Set several values in one pipelined round-trip"""
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    if expire:
+                        pipe.setex(key, expire, dumps(value))
+                    else:
+                        pipe.set(key, dumps(value))
+                await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Redis batch set failed for {len(items)} keys: {e}")
+            return False
+    
+    async def set_tagged(self, key: str, value: Any, tag: str, expire: Optional[int] = None) -> bool:
+        """Set value and record the key under a tag set for targeted invalidation"""
+        try:
+            await self._set_with_tag(self.client, key, dumps(value), tag, expire)
+            return True
+        except Exception as e:
+            print(f"Redis tagged set failed for key {key}: {e}")
+            return False
+    
+    async def get_compressed(self, key: str) -> Optional[Any]:
+        """Get a zstd-compressed JSON value"""
+        try:
+            value = await self.binary_client.get(key)
+            if value:
+                return orjson.loads(_dctx.decompress(value))
+            return None
+        except Exception as e:
+            print(f"Redis compressed get failed for key {key}: {e}")
+            return None
+    
+    async def set_compressed(self, key: str, value: Any, expire: Optional[int] = None, tag: Optional[str] = None) -> bool:
+        """Set a JSON value compressed with zstd, optionally recording it under a tag"""
+        try:
+            await self._set_with_tag(self.binary_client, key, _cctx.compress(dumps(value)), tag, expire)
+            return True
+        except Exception as e:
+            print(f"Redis compressed set failed for key {key}: {e}")
+            return False
+    
+    async def _set_with_tag(self, client: redis.Redis, key: str, payload: bytes,
+                            tag: Optional[str], expire: Optional[int]):
+        """Pipeline a SET and its tag bookkeeping in one round-trip
+        
+        Tags are sorted sets scored by each member's expiry time, so members whose
+        keys have already expired are pruned on every tagged write.
+        """
+        async with client.pipeline(transaction=False) as pipe:
+            if expire:
+                pipe.setex(key, expire, payload)
+            else:
+                pipe.set(key, payload)
+            if tag:
+                now = time.time()
+                pipe.zadd(tag, {key: now + expire if expire else float("inf")})
+                pipe.zremrangebyscore(tag, "-inf", now)
+                if expire:
+                    # The tag lives as long as its longest-lived member, never longer
+                    pipe.expire(tag, expire, nx=True)
+                    pipe.expire(tag, expire, gt=True)
+            await pipe.execute()
+    
+    async def invalidate_tag(self, tag: str) -> bool:
+        """Unlink every key recorded under a tag, along with the tag itself"""
+        # Move the tag aside atomically: keys tagged from here on go into a fresh
+        # tag and are never lost between reading the members and unlinking them
+        detached = f"{tag}:invalidating:{uuid.uuid4().hex}"
+        try:
+            try:
+                await self.client.rename(tag, detached)
+            except ResponseError:
+                # No such key: nothing is tagged
+                return True
+            members = await self.client.zrange(detached, 0, -1)
+            await self.client.unlink(*members, detached)
+            return True
+        except Exception as e:
+            print(f"Redis tag invalidation failed for {tag}: {e}")
+            return False
+    
+    async def acquire_lock(self, key: str, expire: int) -> bool:
+        """Try to take a short-lived lock (SET NX EX)"""
+        try:
+            return bool(await self.client.set(key, "1", nx=True, ex=expire))
+        except Exception as e:
+            print(f"Redis lock failed for key {key}: {e}")
+            # Without Redis there is nothing to coordinate on; let the caller proceed
+            return True
+    
+    async def publish(self, channel: str, message: str) -> bool:
+        """Publish a message on a pub/sub channel"""
+        try:
+            await self.client.publish(channel, message)
+            return True
+        except Exception as e:
+            print(f"Redis publish failed for channel {channel}: {e}")
+            return False
+    
     async def delete(self, key: str) -> bool:
         """Delete key from Redis"""
         try:
@@ -0,0 +1,7 @@
+from typing import Any
+import orjson
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to JSON bytes for caches and clients; datetimes are emitted natively as ISO 8601"""
+    return orjson.dumps(value, default=str, option=orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SERIALIZE_DATACLASS)
@@ -1,18 +1,22 @@
 from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List
 import asyncio
+import logging
 import os
-import json
+import orjson
 from datetime import datetime
 
 # Configuration and Core
 from app.core.config import settings
-from app.core.database import get_db, create_tables, test_connection as test_db
+from app.core.logging_context import install_session_filter
+from app.core.database import get_db, get_async_db, async_engine, create_tables, test_connection as test_db
 from app.core.neo4j_client import neo4j_client
 from app.core.redis_client import redis_client
+from app.core.serialization import dumps
 from app.core.llm import llm_client
 
 # Services
@@ -33,9 +37,14 @@ from app.workflow import simple_agent, log_workflow_execution
 from app.models.schemas import (
     ChatRequest, ChatResponse, CustomerCreate, CustomerUpdate,
     ConversationCreate, MessageCreate, DocumentCreate, HealthCheck,
-    HealthStatus
+    HealthStatus, MemoryCreate, Memory as MemorySchema, MessageBase,
+    Message as MessageSchema, Conversation as ConversationSchema
 )
 
+# Logging is configured once here, at the application entry point
+logging.basicConfig(level=settings.log_level)
+install_session_filter()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI-Powered Customer Support Agent with Reinforcement Learning",
@@ -58,6 +67,15 @@ app.add_middleware(
 if os.path.exists("frontend"):
     app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
+# Fire-and-forget work (e.g. message persistence), referenced until it finishes
+_background_tasks = set()
+
+def _spawn_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 # === STARTUP AND SHUTDOWN EVENTS ===
 
 @app.on_event("startup")
@@ -71,6 +89,14 @@ async def startup_event():
     redis_connected = await redis_client.connect()
     startup_tasks.append(("Redis", redis_connected))
     
+    # Keep the in-process cache tier coherent across workers
+    if redis_connected:
+        await cache_service.start_invalidation_listener()
+    
+    # Apply RL feedback from a single background consumer
+    rl_service = await get_rl_service()
+    await rl_service.start_feedback_consumer()
+    
     # Initialize Neo4j connection
     neo4j_connected = neo4j_client.connect()
     startup_tasks.append(("Neo4j", neo4j_connected))
@@ -97,7 +123,15 @@ async def startup_event():
 async def shutdown_event():
     """Clean shutdown of all connections"""
     print("🛑 Shutting down services...")
+    await cache_service.stop_invalidation_listener()
+    rl_service = await get_rl_service()
+    await rl_service.stop_feedback_consumer()
+    # Let in-flight message writes finish before closing their connections
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+    await async_engine.dispose()
     await redis_client.close()
+    await llm_client.close()
     neo4j_client.close()
     print("✅ Shutdown complete")
 
@@ -121,7 +155,7 @@ async def comprehensive_health_check():
     db_healthy = test_db()
     neo4j_healthy = neo4j_client.test_connection()
     redis_healthy = await redis_client.test_connection()
-    openai_healthy = settings.openai_api_key and llm_client.test_connection()
+    openai_healthy = settings.openai_api_key and await llm_client.test_connection()
     
     # Determine individual service statuses
     db_status = HealthStatus.HEALTHY if db_healthy else HealthStatus.UNHEALTHY
@@ -236,6 +270,81 @@ async def get_customer_insights(customer_id: int, db: Session = Depends(get_db))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# === CONVERSATION MEMORY ENDPOINTS ===
+
+@app.post("/conversations", response_model=ConversationSchema)
+async def create_conversation(conversation_data: ConversationCreate, db: AsyncSession = Depends(get_async_db)):
+    """Start a conversation for a customer"""
+    try:
+        return await memory_service.create_conversation(conversation_data, db)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/conversations/{conversation_id}/messages", response_model=MessageSchema)
+async def add_message(conversation_id: int, message_data: MessageBase, db: AsyncSession = Depends(get_async_db)):
+    """Append a message to a conversation"""
+    try:
+        return await memory_service.add_message(
+            MessageCreate(**message_data.dict(), conversation_id=conversation_id), db
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/conversations/{conversation_id}/end", response_model=ConversationSchema)
+async def end_conversation(conversation_id: int, resolution: str, rating: int = None,
+                           db: AsyncSession = Depends(get_async_db)):
+    """Close a conversation and record it as an episodic memory"""
+    try:
+        conversation = await memory_service.end_conversation(conversation_id, resolution, rating, db)
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return conversation
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/customers/{customer_id}/conversations")
+async def get_conversation_history(customer_id: int, limit: int = 50, db: AsyncSession = Depends(get_async_db)):
+    """Get a customer's conversation history with messages"""
+    try:
+        return await memory_service.get_conversation_history(customer_id, limit, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/customers/{customer_id}/recent-context", response_model=List[MessageSchema])
+async def get_recent_context(customer_id: int, max_messages: int = 10, db: AsyncSession = Depends(get_async_db)):
+    """Get a customer's most recent messages across conversations"""
+    try:
+        return await memory_service.get_recent_context(customer_id, max_messages, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/memories", response_model=MemorySchema)
+async def create_memory(memory_data: MemoryCreate, db: AsyncSession = Depends(get_async_db)):
+    """Record an episodic memory for a customer"""
+    try:
+        return await memory_service.create_memory(memory_data, db)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/customers/{customer_id}/memories", response_model=List[MemorySchema])
+async def get_customer_memories(customer_id: int, memory_type: str = None, limit: int = 100,
+                                db: AsyncSession = Depends(get_async_db)):
+    """Get a customer's active memories, most important first"""
+    try:
+        return await memory_service.get_customer_memories(customer_id, memory_type, db, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/customers/{customer_id}/memory-insights", response_model=Dict[str, Any])
+async def get_memory_insights(customer_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Summarize a customer's memories: types, common tags and key memories"""
+    try:
+        return await memory_service.get_memory_insights(customer_id, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # === ETL AND SYNC ENDPOINTS ===
 
 @app.get("/etl/status", response_model=Dict[str, Any])
@@ -311,14 +420,14 @@ async def chat_endpoint(chat_request: ChatRequest, db: Session = Depends(get_db)
             }
         )
         
-        # Store conversation in memory
-        asyncio.create_task(
+        # Store conversation in memory (own async session; the request's closes on return)
+        _spawn_background(
             memory_service.store_conversation(
-                customer_id=workflow_result["customer_profile"]["customer_id"],
+                customer_id=response.customer_id,
+                session_id=response.session_id,
                 user_message=chat_request.message,
                 agent_response=workflow_result["response"],
-                metadata=response.metadata,
-                db_session=db
+                confidence_score=response.confidence_score
             )
         )
         
@@ -417,7 +526,7 @@ class ConnectionManager:
     
     async def send_personal_message(self, message: Dict[str, Any], session_id: str):
         if session_id in self.active_connections:
-            await self.active_connections[session_id].send_text(json.dumps(message))
+            await self.active_connections[session_id].send_text(dumps(message).decode())
     
     async def send_to_customer(self, message: Dict[str, Any], customer_id: str):
         session_id = self.customer_sessions.get(customer_id)
@@ -439,7 +548,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str, customer_id:
         while True:
             # Receive message from client
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            message_data = orjson.loads(data)
             
             user_message = message_data.get("message", "")
             if not user_message.strip():
@@ -485,6 +594,16 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str, customer_id:
                 )
                 await connection_manager.send_personal_message(response_message, session_id)
                 
+                _spawn_background(
+                    memory_service.store_conversation(
+                        customer_id=response_message["customer_id"],
+                        session_id=session_id,
+                        user_message=user_message,
+                        agent_response=workflow_result["response"],
+                        confidence_score=response_message["metadata"]["confidence"]
+                    )
+                )
+                
                 # Record metrics
                 await workflow_metrics.record_execution(workflow_result)
                 
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Float, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
+from app.core.config import settings
 from app.core.database import Base
 
 
@@ -42,6 +45,9 @@ class Conversation(Base):
     priority = Column(String(20))  # low, medium, high, urgent
     
     # Summary and outcomes
+    first_user_msg = Column(String(100))  # Maintained by add_message for summaries
+    last_assistant_msg = Column(String(100))
+    message_count = Column(Integer, default=0)
     summary = Column(Text)
     resolution = Column(Text)
     satisfaction_rating = Column(Integer)  # 1-5 scale
@@ -60,6 +66,7 @@ class Message(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"))  # Denormalized from conversation
     
     # Message content
     content = Column(Text, nullable=False)
@@ -77,6 +84,10 @@ class Message(Base):
     conversation = relationship("Conversation", back_populates="messages")
 
 
+# Recent-context lookups scan a customer's messages newest first without joining conversations
+Index("idx_msg_cust_time", Message.customer_id, Message.created_at.desc())
+
+
 class Interaction(Base):
     __tablename__ = "interactions"
     
@@ -117,6 +128,14 @@ class Document(Base):
     # Search and retrieval
     keywords = Column(Text)  # Comma-separated keywords
     embedding_vector = Column(Text)  # Serialized vector for similarity search
+    search_vec = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', coalesce(keywords, '')), 'B') || "
+        "setweight(to_tsvector('english', content), 'C')",
+        persisted=True
+    ))  # Weighted full-text index: title > keywords > content
+    embedding = Column(Vector(settings.embedding_dimensions))  # Normalized sentence embedding
+    token_count = Column(Integer)  # Keyword count, precomputed for rank normalization
     
     # Status and versioning
     is_active = Column(Boolean, default=True)
@@ -125,6 +144,15 @@ class Document(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_documents_search_vec", "search_vec", postgresql_using="gin"),
+        Index(
+            "docs_emb_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"}
+        ),
+    )
 
 
 class ConversationMemory(Base):
@@ -140,7 +168,7 @@ class ConversationMemory(Base):
     
     # Context
     source_conversation_id = Column(Integer, ForeignKey("conversations.id"))
-    tags = Column(String(255))  # Comma-separated tags
+    tags = Column(String(255))  # Comma-separated tags (normalized into memory_tags)
     
     # Lifecycle
     is_active = Column(Boolean, default=True)
@@ -148,4 +176,27 @@ class ConversationMemory(Base):
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    tag_rows = relationship("MemoryTag", back_populates="memory", cascade="all, delete-orphan")
+
+
+# Matches get_customer_memories' filter and ORDER BY so a LIMIT stops the index scan early
+Index(
+    "idx_mem_cust_active_imp",
+    ConversationMemory.customer_id,
+    ConversationMemory.is_active,
+    ConversationMemory.importance.desc(),
+    ConversationMemory.created_at.desc()
+)
+
+
+class MemoryTag(Base):
+    __tablename__ = "memory_tags"
+    
+    memory_id = Column(Integer, ForeignKey("conversation_memory.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(100), primary_key=True, index=True)
+    
+    # Relationships
+    memory = relationship("ConversationMemory", back_populates="tag_rows")
\ No newline at end of file
@@ -1,7 +1,13 @@
 from typing import Optional, Dict, Any, List
+import asyncio
 import hashlib
-import json
+import logging
+import orjson
+from cachetools import TTLCache
 from app.core.redis_client import redis_client
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
 
 
 class CacheService:
@@ -9,16 +15,34 @@ class CacheService:
     
     # Cache TTL constants (in seconds)
     CUSTOMER_SESSION_TTL = 3600  # 1 hour
+    CUSTOMER_PROFILE_TTL = 300   # 5 minutes
     DOCUMENT_SEARCH_TTL = 1800   # 30 minutes
     GRAPH_RESULTS_TTL = 3600     # 1 hour
     LLM_RESPONSE_TTL = 600       # 10 minutes
     
+    # Cache tag sets (track keys for invalidation without pattern scans)
+    DOCUMENT_SEARCH_TAG = "tags:docs_search"
+    SIMILAR_DOCS_TAG = "tags:similar_docs"
+    
+    # Single-flight settings for recomputing missed keys
+    FILL_LOCK_TTL = 5            # seconds
+    FILL_POLL_INTERVAL = 0.05    # seconds
+    FILL_POLL_ATTEMPTS = 40
+    
+    # In-process tier in front of Redis for hot keys
+    LOCAL_CACHE_SIZE = 2048
+    LOCAL_CACHE_TTL = 60         # 1 minute
+    INVALIDATION_CHANNEL = "cache:invalidate"
+    LISTENER_MAX_BACKOFF = 30    # seconds between resubscribe attempts, at most
+    
     def __init__(self):
         self.redis = redis_client
+        self.local = TTLCache(maxsize=self.LOCAL_CACHE_SIZE, ttl=self.LOCAL_CACHE_TTL)
+        self._invalidation_listener = None
     
     def _hash_query(self, query: str) -> str:
-        """Create consistent hash for query caching"""
-        return hashlib.md5(query.encode()).hexdigest()
+        """Create consistent fixed-length (32 hex chars) hash for query caching"""
+        return hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
     
     # Customer Session Caching
     async def cache_customer_session(self, session_id: str, customer_data: Dict[str, Any]) -> bool:
@@ -36,18 +60,154 @@ class CacheService:
         cache_key = f"customer:session:{session_id}"
         return await self.redis.delete(cache_key)
     
+    # Customer Profile Caching (workflow hot path)
+    async def cache_customer_profile(self, customer_id: int, profile: Dict[str, Any]) -> bool:
+        """Cache the workflow's customer profile"""
+        cache_key = f"customer:profile:{customer_id}"
+        return await self.redis.set(cache_key, profile, self.CUSTOMER_PROFILE_TTL)
+    
+    async def get_cached_customer_profile(self, customer_id: int) -> Optional[Dict[str, Any]]:
+        """Retrieve a cached workflow customer profile"""
+        cache_key = f"customer:profile:{customer_id}"
+        return await self.redis.get(cache_key)
+    
+    async def invalidate_customer_profile(self, customer_id: int) -> bool:
+        """Invalidate a cached workflow customer profile"""
+        cache_key = f"customer:profile:{customer_id}"
+        return await self.redis.delete(cache_key)
+    
+    # Two-Level (In-Process + Redis) Caching
+    async def get_two_level(self, cache_key: str, compressed: bool = False) -> Optional[Any]:
+        """Read through the in-process cache, then Redis
+        
+        Local entries hold serialized JSON, so each hit decodes a private copy
+        with the same types a Redis hit returns.
+        """
+        payload = self.local.get(cache_key)
+        if payload is not None:
+            return orjson.loads(payload)
+        
+        value = await self._get_remote(cache_key, compressed)
+        if value is not None:
+            self._set_local(cache_key, value)
+        return value
+    
+    def _set_local(self, cache_key: str, value: Any):
+        """Store a value in the in-process tier in its serialized form"""
+        self.local[cache_key] = dumps(value)
+    
+    async def _get_remote(self, cache_key: str, compressed: bool) -> Optional[Any]:
+        """Read a key from Redis, decompressing if it was stored compressed"""
+        if compressed:
+            return await self.redis.get_compressed(cache_key)
+        return await self.redis.get(cache_key)
+    
+    def _evict_local(self, prefix: str):
+        """Drop in-process entries whose key starts with prefix"""
+        for key in [key for key in list(self.local.keys()) if key.startswith(prefix)]:
+            self.local.pop(key, None)
+    
+    async def _broadcast_invalidation(self, prefix: str) -> bool:
+        """Evict a key prefix locally and on every other worker"""
+        self._evict_local(prefix)
+        return await self.redis.publish(self.INVALIDATION_CHANNEL, prefix)
+    
+    async def start_invalidation_listener(self):
+        """Subscribe to invalidation broadcasts from other workers"""
+        if self._invalidation_listener is None and self.redis.client:
+            self._invalidation_listener = asyncio.create_task(self._listen_for_invalidations())
+    
+    async def stop_invalidation_listener(self):
+        """Stop the invalidation subscriber"""
+        if self._invalidation_listener:
+            self._invalidation_listener.cancel()
+            self._invalidation_listener = None
+    
+    async def _listen_for_invalidations(self):
+        """Evict local entries named by other workers' invalidation broadcasts
+        
+        Resubscribes with exponential backoff when the connection drops. The local
+        tier is cleared on each drop since broadcasts may have been missed meanwhile.
+        """
+        backoff = 1
+        while True:
+            pubsub = self.redis.client.pubsub()
+            try:
+                await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                backoff = 1
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._evict_local(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation listener failed, retrying in %ss: %s", backoff, e)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+            
+            self.local.clear()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.LISTENER_MAX_BACKOFF)
+    
+    # Cache Stampede Protection
+    async def acquire_fill_lock(self, cache_key: str) -> bool:
+        """Claim the right to recompute a missed key; False if another worker holds it"""
+        return await self.redis.acquire_lock(f"{cache_key}:lock", self.FILL_LOCK_TTL)
+    
+    async def release_fill_lock(self, cache_key: str) -> bool:
+        """Release the recompute lock once the key has been filled"""
+        return await self.redis.delete(f"{cache_key}:lock")
+    
+    async def wait_for_fill(self, cache_key: str, compressed: bool = False) -> Optional[Any]:
+        """Poll for a value being computed by the lock holder; None if it never arrives"""
+        for _ in range(self.FILL_POLL_ATTEMPTS):
+            await asyncio.sleep(self.FILL_POLL_INTERVAL)
+            value = await self._get_remote(cache_key, compressed)
+            if value is not None:
+                return value
+        return None
+    
     # Document Search Caching
+    def document_search_key(self, query: str) -> str:
+        """Redis key for cached document search results"""
+        return f"docs:search:{self._hash_query(query)}"
+    
     async def cache_document_search(self, query: str, results: List[Dict[str, Any]]) -> bool:
         """Cache document search results"""
-        query_hash = self._hash_query(query)
-        cache_key = f"docs:search:{query_hash}"
-        return await self.redis.set(cache_key, results, self.DOCUMENT_SEARCH_TTL)
+        cache_key = self.document_search_key(query)
+        self._set_local(cache_key, results)
+        return await self.redis.set_tagged(cache_key, results, self.DOCUMENT_SEARCH_TAG, self.DOCUMENT_SEARCH_TTL)
     
     async def get_cached_document_search(self, query: str) -> Optional[List[Dict[str, Any]]]:
         """Retrieve cached document search results"""
-        query_hash = self._hash_query(query)
-        cache_key = f"docs:search:{query_hash}"
-        return await self.redis.get(cache_key)
+        cache_key = self.document_search_key(query)
+        return await self.get_two_level(cache_key)
+    
+    async def invalidate_document_searches(self) -> bool:
+        """Invalidate all cached document search and similarity results"""
+        await self._broadcast_invalidation("docs:search:")
+        searches = await self.redis.invalidate_tag(self.DOCUMENT_SEARCH_TAG)
+        similar = await self.redis.invalidate_tag(self.SIMILAR_DOCS_TAG)
+        return searches and similar
+    
+    # Conversation History Caching
+    def _conversation_history_tag(self, customer_id: int) -> str:
+        """Tag set tracking a customer's conversation history keys"""
+        return f"tags:conv_hist:{customer_id}"
+    
+    async def cache_conversation_history(self, customer_id: int, cache_key: str,
+                                         history: List[Dict[str, Any]], expire: int) -> bool:
+        """Cache conversation history (zstd-compressed) under the customer's history tag"""
+        self._set_local(cache_key, history)
+        return await self.redis.set_compressed(cache_key, history, expire, self._conversation_history_tag(customer_id))
+    
+    async def invalidate_conversation_history(self, customer_id: int) -> bool:
+        """Invalidate all cached conversation history pages for a customer"""
+        await self._broadcast_invalidation(f"conversation_history:{customer_id}:")
+        return await self.redis.invalidate_tag(self._conversation_history_tag(customer_id))
     
     # Graph Query Results Caching
     async def cache_graph_results(self, customer_id: int, query_type: str, results: List[Dict[str, Any]]) -> bool:
@@ -90,6 +90,7 @@ class CustomerService:
         
         # Invalidate cache to force refresh on next request
         await self.cache.invalidate_customer_session(customer.session_id)
+        await self.cache.invalidate_customer_profile(customer.id)
         
         return customer
     
@@ -1,6 +1,6 @@
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import asyncio
 import logging
 from pathlib import Path
@@ -14,6 +14,50 @@ from app.services.rag import rag_service
 logger = logging.getLogger(__name__)
 
 
+def _chunk_document(content: str, category: str, filename: str) -> List[Dict[str, Any]]:
+    """Split a markdown document into header-delimited chunks"""
+    
+    # Split content into sections (chunk by headers)
+    sections = []
+    
+    # Split by ## headers first
+    major_sections = content.split('\n## ')
+    if len(major_sections) == 1:
+        # Fall back to # headers
+        major_sections = content.split('\n# ')
+    
+    for i, section in enumerate(major_sections):
+        section_content = section.strip()
+        
+        if len(section_content) < 50:  # Skip very short sections
+            continue
+        
+        # Further split long sections by ### headers
+        subsections = section_content.split('\n### ')
+        
+        for j, subsection in enumerate(subsections):
+            subsection_content = subsection.strip()
+            
+            if len(subsection_content) < 30:
+                continue
+            
+            # Create chunk metadata
+            chunk_data = {
+                "content": subsection_content,
+                "category": category,
+                "source": filename,
+                "section_index": i,
+                "subsection_index": j,
+                "word_count": len(subsection_content.split()),
+                "char_count": len(subsection_content),
+                "created_at": datetime.utcnow().isoformat()
+            }
+            
+            sections.append(chunk_data)
+    
+    return sections
+
+
 class ETLService:
     """ETL pipeline for syncing PostgreSQL data to Neo4j with intelligent batching"""
     
@@ -78,31 +122,22 @@ class ETLService:
     async def _sync_customer_batch(self, customers: List[Customer], db: Session) -> Dict[str, int]:
         """Sync a batch of customers to Neo4j"""
         
-        synced = 0
-        failed = 0
+        customers_data = [
+            {
+                "id": customer.id,
+                "name": customer.name,
+                "email": customer.email,
+                "communication_style": customer.communication_style,
+                "relationship_stage": customer.relationship_stage,
+                "satisfaction_score": customer.satisfaction_score,
+                "created_at": customer.created_at.isoformat() if customer.created_at else None
+            }
+            for customer in customers
+        ]
         
-        for customer in customers:
-            try:
-                customer_data = {
-                    "id": customer.id,
-                    "name": customer.name,
-                    "email": customer.email,
-                    "communication_style": customer.communication_style,
-                    "relationship_stage": customer.relationship_stage,
-                    "satisfaction_score": customer.satisfaction_score,
-                    "created_at": customer.created_at.isoformat() if customer.created_at else None
-                }
-                
-                success = await self.graph.sync_customer_to_graph(customer_data)
-                
-                if success:
-                    synced += 1
-                else:
-                    failed += 1
-                    
-            except Exception as e:
-                print(f"Failed to sync customer {customer.id}: {e}")
-                failed += 1
+        # One round-trip to Neo4j for the whole batch
+        synced = await self.graph.sync_customers_to_graph(customers_data) if customers_data else 0
+        failed = len(customers_data) - synced
         
         return {"synced": synced, "failed": failed}
     
@@ -187,11 +222,11 @@ class ETLService:
         finally:
             db.close()
     
-    async def incremental_sync(self, since: datetime = None) -> Dict[str, Any]:
-        """Incremental sync of recent changes"""
+    async def incremental_sync(self, since: datetime = None, batch_size: int = 1000) -> Dict[str, Any]:
+        """Incremental sync of recent changes, written to Neo4j in batches of batch_size"""
         
         if not since:
-            since = datetime.utcnow() - timedelta(hours=1)  # Default: last hour
+            since = datetime.now(timezone.utc) - timedelta(hours=1)  # Default: last hour
         
         db = SessionLocal()
         try:
@@ -210,8 +245,9 @@ class ETLService:
             
             if recent_customers:
                 print(f"🔄 Syncing {len(recent_customers)} updated customers")
-                batch_result = await self._sync_customer_batch(recent_customers, db)
-                sync_stats["customers_synced"] = batch_result["synced"]
+                for start in range(0, len(recent_customers), batch_size):
+                    batch_result = await self._sync_customer_batch(recent_customers[start:start + batch_size], db)
+                    sync_stats["customers_synced"] += batch_result["synced"]
             
             # Sync recent conversations
             recent_conversations = db.query(Conversation).filter(
@@ -221,39 +257,47 @@ class ETLService:
             if recent_conversations:
                 print(f"🔄 Syncing {len(recent_conversations)} new conversations")
                 
-                for conv in recent_conversations:
-                    try:
-                        messages = db.query(Message).filter(
-                            Message.conversation_id == conv.id
-                        ).all()
-                        
-                        conv_data = {
-                            "id": conv.id,
-                            "customer_id": conv.customer_id,
-                            "topic": conv.topic,
-                            "status": conv.status,
-                            "satisfaction_rating": conv.satisfaction_rating,
-                            "resolution": conv.resolution,
-                            "started_at": conv.started_at.isoformat() if conv.started_at else None
-                        }
-                        
-                        message_data = [
-                            {
-                                "id": msg.id,
-                                "content": msg.content,
-                                "message_type": msg.message_type,
-                                "intent": msg.intent,
-                                "sentiment": msg.sentiment
+                for start in range(0, len(recent_conversations), batch_size):
+                    conversations = recent_conversations[start:start + batch_size]
+                    
+                    # Load the whole batch's messages in one query
+                    messages_by_conversation = {conv.id: [] for conv in conversations}
+                    for msg in db.query(Message).filter(
+                        Message.conversation_id.in_(messages_by_conversation)
+                    ).all():
+                        messages_by_conversation[msg.conversation_id].append(msg)
+                    
+                    for conv in conversations:
+                        try:
+                            messages = messages_by_conversation[conv.id]
+                            
+                            conv_data = {
+                                "id": conv.id,
+                                "customer_id": conv.customer_id,
+                                "topic": conv.topic,
+                                "status": conv.status,
+                                "satisfaction_rating": conv.satisfaction_rating,
+                                "resolution": conv.resolution,
+                                "started_at": conv.started_at.isoformat() if conv.started_at else None
                             }
-                            for msg in messages
-                        ]
-                        
-                        success = await self.graph.sync_conversation_to_graph(conv_data, message_data)
-                        if success:
-                            sync_stats["conversations_synced"] += 1
                             
-                    except Exception as e:
-                        print(f"Failed to sync conversation {conv.id}: {e}")
+                            message_data = [
+                                {
+                                    "id": msg.id,
+                                    "content": msg.content,
+                                    "message_type": msg.message_type,
+                                    "intent": msg.intent,
+                                    "sentiment": msg.sentiment
+                                }
+                                for msg in messages
+                            ]
+                            
+                            success = await self.graph.sync_conversation_to_graph(conv_data, message_data)
+                            if success:
+                                sync_stats["conversations_synced"] += 1
+                                
+                        except Exception as e:
+                            print(f"Failed to sync conversation {conv.id}: {e}")
             
             sync_stats["completed_at"] = datetime.utcnow().isoformat()
             
@@ -469,8 +513,9 @@ class ETLService:
             except Exception as e:
                 print(f"❌ Scheduled sync error: {e}")
     
-    async def sync_knowledge_base(self, documents_path: str = "data/documents") -> Dict[str, Any]:
-        """Sync knowledge base documents to RAG system"""
+    async def sync_knowledge_base(self, documents_path: str = "data/documents", batch_size: int = 1000,
+                                  concurrency: int = 8) -> Dict[str, Any]:
+        """Sync knowledge base documents to RAG system, caching metadata in batches of batch_size"""
         
         try:
             documents_dir = Path(documents_path)
@@ -496,30 +541,25 @@ class ETLService:
             
             logger.info(f"📚 Starting knowledge base sync: {len(doc_files)} documents")
             
-            for doc_file in doc_files:
-                try:
-                    logger.info(f"📖 Processing: {doc_file.name}")
-                    
-                    # Read document content
-                    with open(doc_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Determine category from filename
-                    category = doc_file.stem.replace('_', ' ').title()
-                    
-                    # Process document through RAG service
-                    chunks_processed = await self._process_document_for_rag(
-                        content, category, doc_file.name
-                    )
-                    
+            # Document metadata waiting to be written to Redis in pipelined batches
+            pending_metadata = {}
+            
+            # Documents are processed concurrently, at most `concurrency` at a time
+            semaphore = asyncio.Semaphore(concurrency)
+            results = await asyncio.gather(*[
+                self._sync_document(doc_file, semaphore, pending_metadata) for doc_file in doc_files
+            ])
+            
+            for chunks_processed in results:
+                if chunks_processed is None:
+                    sync_stats["failed_documents"] += 1
+                else:
                     sync_stats["synced_documents"] += 1
                     sync_stats["total_chunks"] += chunks_processed
-                    
-                    logger.info(f"✅ Processed {chunks_processed} chunks from {doc_file.name}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process document {doc_file.name}: {e}")
-                    sync_stats["failed_documents"] += 1
+            
+            metadata_items = list(pending_metadata.items())
+            for start in range(0, len(metadata_items), batch_size):
+                await self.cache.redis.set_many(dict(metadata_items[start:start + batch_size]), 86400 * 7)  # 7 days
             
             sync_stats["completed_at"] = datetime.utcnow().isoformat()
             
@@ -534,47 +574,39 @@ class ETLService:
             logger.error(f"Knowledge base sync failed: {e}")
             return {"error": str(e), "synced_documents": 0}
     
-    async def _process_document_for_rag(self, content: str, category: str, filename: str) -> int:
-        """Process a document into chunks for RAG system"""
+    async def _sync_document(self, doc_file: Path, semaphore: asyncio.Semaphore,
+                             pending_metadata: Dict[str, Any]) -> Optional[int]:
+        """Process one knowledge base file; returns its chunk count, or None on failure"""
         
-        try:
-            # Split content into sections (chunk by headers)
-            sections = []
-            
-            # Split by ## headers first
-            major_sections = content.split('\n## ')
-            if len(major_sections) == 1:
-                # Fall back to # headers
-                major_sections = content.split('\n# ')
-            
-            for i, section in enumerate(major_sections):
-                section_content = section.strip()
+        async with semaphore:
+            try:
+                logger.info(f"📖 Processing: {doc_file.name}")
                 
-                if len(section_content) < 50:  # Skip very short sections
-                    continue
+                # Read document content off the event loop
+                content = await asyncio.to_thread(doc_file.read_text, encoding='utf-8')
                 
-                # Further split long sections by ### headers
-                subsections = section_content.split('\n### ')
+                # Determine category from filename
+                category = doc_file.stem.replace('_', ' ').title()
                 
-                for j, subsection in enumerate(subsections):
-                    subsection_content = subsection.strip()
-                    
-                    if len(subsection_content) < 30:
-                        continue
-                    
-                    # Create chunk metadata
-                    chunk_data = {
-                        "content": subsection_content,
-                        "category": category,
-                        "source": filename,
-                        "section_index": i,
-                        "subsection_index": j,
-                        "word_count": len(subsection_content.split()),
-                        "char_count": len(subsection_content),
-                        "created_at": datetime.utcnow().isoformat()
-                    }
-                    
-                    sections.append(chunk_data)
+                # Process document through RAG service
+                chunks_processed = await self._process_document_for_rag(
+                    content, category, doc_file.name, pending_metadata
+                )
+                
+                logger.info(f"✅ Processed {chunks_processed} chunks from {doc_file.name}")
+                return chunks_processed
+                
+            except Exception as e:
+                logger.error(f"Failed to process document {doc_file.name}: {e}")
+                return None
+    
+    async def _process_document_for_rag(self, content: str, category: str, filename: str,
+                                        pending_metadata: Dict[str, Any]) -> int:
+        """Process a document into chunks for RAG system, staging its metadata for caching"""
+        
+        try:
+            # Split content into header-delimited chunks
+            sections = _chunk_document(content, category, filename)
             
             # Process chunks through RAG service
             # In production, this would:
@@ -594,9 +626,8 @@ class ETLService:
                 "status": "processed"
             }
             
-            # Cache document info
-            cache_key = f"knowledge_doc:{filename}"
-            await self.cache.redis.set(cache_key, doc_metadata, 86400 * 7)  # 7 days
+            # Cache document info (written by the caller in batches)
+            pending_metadata[f"knowledge_doc:{filename}"] = doc_metadata
             
             return len(sections)
             
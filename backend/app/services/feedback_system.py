@@ -270,7 +270,7 @@ class LLMBasedFeedbackGenerator:
         
         try:
             messages = [{"role": "user", "content": analysis_prompt}]
-            response = llm_client.generate_response(messages)
+            response = await llm_client.generate_response(messages)
             
             if response:
                 # Extract numerical score
@@ -1,5 +1,6 @@
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
+import asyncio
 import json
 
 from app.core.neo4j_client import neo4j_client
@@ -243,6 +244,49 @@ class GraphService:
             print(f"Customer sync failed: {e}")
             return False
     
+    async def sync_customers_to_graph(self, customers_data: List[Dict[str, Any]]) -> int:
+        """Sync a batch of customers to Neo4j in one UNWIND query"""
+        
+        query = """
+        UNWIND $rows AS row
+        MERGE (c:Customer {customer_id: row.customer_id})
+        SET c.name = row.name,
+            c.email = row.email,
+            c.communication_style = row.communication_style,
+            c.relationship_stage = row.relationship_stage,
+            c.satisfaction_score = row.satisfaction_score,
+            c.created_at = row.created_at,
+            c.updated_at = datetime()
+        RETURN c.customer_id as customer_id
+        """
+        
+        rows = [
+            {
+                "customer_id": customer_data["id"],
+                "name": customer_data.get("name", ""),
+                "email": customer_data.get("email", ""),
+                "communication_style": customer_data.get("communication_style", ""),
+                "relationship_stage": customer_data.get("relationship_stage", ""),
+                "satisfaction_score": customer_data.get("satisfaction_score", 0.5),
+                "created_at": customer_data.get("created_at", datetime.utcnow().isoformat())
+            }
+            for customer_data in customers_data
+        ]
+        
+        try:
+            result = self.neo4j.execute_query(query, {"rows": rows})
+            
+            # Invalidate similarity caches since customer data changed
+            await asyncio.gather(*[
+                self.cache.invalidate_customer_graph_cache(row["customer_id"]) for row in rows
+            ])
+            
+            return len(result)
+            
+        except Exception as e:
+            print(f"Customer batch sync failed: {e}")
+            return 0
+    
     async def sync_conversation_to_graph(self, conversation_data: Dict[str, Any], messages: List[Dict[str, Any]]) -> bool:
         """Sync conversation and messages to Neo4j with relationships"""
         
@@ -1,190 +1,317 @@
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, func, insert, select, update
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+import asyncio
 
-from app.models.database import Conversation, Message, ConversationMemory, Customer
+from app.core.database import AsyncSessionLocal
+from app.models.database import Conversation, Message, ConversationMemory, MemoryTag, Customer
 from app.models.schemas import (
-    ConversationCreate, MessageCreate, MemoryCreate,
+    ConversationCreate, MessageCreate, MemoryCreate, ConversationStatus, MessageType,
     Conversation as ConversationSchema, Message as MessageSchema
 )
 from app.services.cache import cache_service
 
 
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+@dataclass(slots=True)
+class _MsgOut:
+    """Conversation history message row (serialized natively by orjson)"""
+    id: int
+    content: str
+    message_type: Optional[str]
+    intent: Optional[str]
+    sentiment: Optional[str]
+    created_at: Optional[str]
+    
+    def __getitem__(self, key: str) -> Any:
+        # Same read access as the dicts returned on a cache hit
+        return getattr(self, key)
+
+
+@dataclass(slots=True)
+class _ConvOut:
+    """Conversation history entry (serialized natively by orjson)"""
+    conversation_id: int
+    topic: Optional[str]
+    status: Optional[str]
+    started_at: Optional[str]
+    ended_at: Optional[str]
+    summary: Optional[str]
+    messages: List[_MsgOut]
+    
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+
 class MemoryService:
     """Conversation and episodic memory management with caching"""
     
     def __init__(self):
         self.cache = cache_service
     
-    async def create_conversation(self, conversation_data: ConversationCreate, db: Session) -> Conversation:
+    async def create_conversation(self, conversation_data: ConversationCreate, db: AsyncSession) -> Conversation:
         """Create new conversation"""
-        conversation = Conversation(**conversation_data.dict())
-        conversation.started_at = datetime.utcnow()
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+        # INSERT ... RETURNING loads ids and server defaults without a follow-up SELECT
+        conversation = await db.scalar(
+            insert(Conversation).values(
+                **conversation_data.dict(), started_at=datetime.utcnow()
+            ).returning(Conversation)
+        )
         
-        # Update customer's last interaction
-        customer = db.query(Customer).filter(Customer.id == conversation.customer_id).first()
-        if customer:
-            customer.last_interaction = datetime.utcnow()
-            db.commit()
+        # Update customer's last interaction in the same transaction
+        session_id = await self._touch_customer(db, conversation.customer_id)
+        await db.commit()
+        
+        if session_id:
             # Invalidate customer cache
-            await self.cache.invalidate_customer_session(customer.session_id)
+            await self.cache.invalidate_customer_session(session_id)
         
         return conversation
     
-    async def add_message(self, message_data: MessageCreate, db: Session) -> Message:
+    async def add_message(self, message_data: MessageCreate, db: AsyncSession) -> Message:
         """Add message to conversation"""
-        message = Message(**message_data.dict())
-        message.created_at = datetime.utcnow()
-        db.add(message)
-        db.commit()
-        db.refresh(message)
-        
-        # Update conversation's last activity
-        conversation = db.query(Conversation).filter(
-            Conversation.id == message.conversation_id
-        ).first()
-        if conversation:
-            # Update customer's last interaction
-            customer = db.query(Customer).filter(Customer.id == conversation.customer_id).first()
-            if customer:
-                customer.last_interaction = datetime.utcnow()
-                db.commit()
-                # Invalidate customer cache
-                await self.cache.invalidate_customer_session(customer.session_id)
+        # Maintain the conversation's summary fields and resolve its customer in one UPDATE
+        content_preview = message_data.content[:100]
+        conversation_values = {"message_count": func.coalesce(Conversation.message_count, 0) + 1}
+        if message_data.message_type == "user":
+            conversation_values["first_user_msg"] = func.coalesce(Conversation.first_user_msg, content_preview)
+        elif message_data.message_type == "assistant":
+            conversation_values["last_assistant_msg"] = content_preview
+        
+        customer_id = (await db.execute(
+            update(Conversation)
+            .where(Conversation.id == message_data.conversation_id)
+            .values(**conversation_values)
+            .returning(Conversation.customer_id)
+            .execution_options(synchronize_session=False)
+        )).scalar_one_or_none()
+        
+        message = await db.scalar(
+            insert(Message).values(
+                **message_data.dict(), customer_id=customer_id, created_at=datetime.utcnow()
+            ).returning(Message)
+        )
+        
+        # Update customer's last interaction
+        session_id = await self._touch_customer(db, customer_id) if customer_id else None
+        await db.commit()
+        
+        if session_id:
+            # Invalidate customer cache
+            await self.cache.invalidate_customer_session(session_id)
         
         return message
     
-    async def get_conversation_history(self, customer_id: int, limit: int = 50, db: Session = None) -> List[Dict[str, Any]]:
-        """Get conversation history with intelligent caching"""
+    async def _touch_customer(self, db: AsyncSession, customer_id) -> Optional[str]:
+        """Stage a last_interaction update and return the customer's session id"""
+        result = await db.execute(
+            update(Customer)
+            .where(Customer.id == customer_id)
+            .values(last_interaction=datetime.utcnow())
+            .returning(Customer.session_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+    
+    async def store_conversation(self, customer_id: Optional[int], session_id: str, user_message: str,
+                                 agent_response: str, confidence_score: Optional[float] = None) -> Optional[int]:
+        """Persist a chat exchange in the session's active conversation
+        
+        Runs after the response is sent, so it opens its own session rather than
+        borrowing the request's. Both messages land in one transaction; returns
+        the conversation id.
+        """
+        if not customer_id:
+            return None
+        
+        async with AsyncSessionLocal() as db:
+            conversation_id = await db.scalar(
+                select(Conversation.id).where(
+                    Conversation.session_id == session_id,
+                    Conversation.status == ConversationStatus.ACTIVE.value
+                ).order_by(desc(Conversation.started_at)).limit(1)
+            )
+            if conversation_id is None:
+                conversation_id = await db.scalar(
+                    insert(Conversation).values(
+                        **ConversationCreate(customer_id=customer_id, session_id=session_id).dict(),
+                        started_at=datetime.utcnow()
+                    ).returning(Conversation.id)
+                )
+            
+            # Both messages and the summary fields in one round of statements
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(
+                    message_count=func.coalesce(Conversation.message_count, 0) + 2,
+                    first_user_msg=func.coalesce(Conversation.first_user_msg, user_message[:100]),
+                    last_assistant_msg=agent_response[:100]
+                )
+                .execution_options(synchronize_session=False)
+            )
+            now = datetime.utcnow()
+            await db.execute(insert(Message), [
+                {"conversation_id": conversation_id, "customer_id": customer_id, "content": user_message,
+                 "message_type": MessageType.USER.value, "confidence_score": None, "created_at": now},
+                {"conversation_id": conversation_id, "customer_id": customer_id, "content": agent_response,
+                 "message_type": MessageType.ASSISTANT.value, "confidence_score": confidence_score, "created_at": now},
+            ])
+            customer_session_id = await self._touch_customer(db, customer_id)
+            await db.commit()
+        
+        if customer_session_id:
+            await self.cache.invalidate_customer_session(customer_session_id)
+        await self.cache.invalidate_conversation_history(customer_id)
+        return conversation_id
+    
+    async def get_conversation_history(self, customer_id: int, limit: int = 50, db: AsyncSession = None) -> List[Any]:
+        """Get conversation history with intelligent caching
+        
+        A cache miss returns _ConvOut entries and a hit returns the equivalent dicts;
+        timestamps are ISO strings either way and both support item access.
+        """
         # Create cache key based on customer and limit
         cache_key = f"conversation_history:{customer_id}:{limit}"
         
         # Try cache first (20-60x faster than DB query)
-        cached_history = await self.cache.redis.get(cache_key)
+        cached_history = await self.cache.get_two_level(cache_key, compressed=True)
         if cached_history:
             return cached_history
         
+        # Only one worker recomputes a missed history; the rest wait for its result
+        fill_lock = await self.cache.acquire_fill_lock(cache_key)
+        if not fill_lock:
+            cached_history = await self.cache.wait_for_fill(cache_key, compressed=True)
+            if cached_history is not None:
+                return cached_history
+        
         # Cache miss - get from database
-        conversations = db.query(Conversation).filter(
-            Conversation.customer_id == customer_id
-        ).order_by(desc(Conversation.started_at)).limit(limit).all()
-        
-        history = []
-        for conv in conversations:
-            messages = db.query(Message).filter(
-                Message.conversation_id == conv.id
-            ).order_by(Message.created_at).all()
-            
-            conv_data = {
-                "conversation_id": conv.id,
-                "topic": conv.topic,
-                "status": conv.status,
-                "started_at": conv.started_at.isoformat() if conv.started_at else None,
-                "ended_at": conv.ended_at.isoformat() if conv.ended_at else None,
-                "summary": conv.summary,
-                "messages": [
-                    {
-                        "id": msg.id,
-                        "content": msg.content,
-                        "message_type": msg.message_type,
-                        "intent": msg.intent,
-                        "sentiment": msg.sentiment,
-                        "created_at": msg.created_at.isoformat() if msg.created_at else None
-                    }
-                    for msg in messages
-                ]
-            }
-            history.append(conv_data)
+        conversations = (await db.scalars(
+            select(Conversation).where(
+                Conversation.customer_id == customer_id
+            ).order_by(desc(Conversation.started_at)).limit(limit)
+        )).all()
+        
+        # All messages for the page of conversations in one query
+        messages_by_conv = {conv.id: [] for conv in conversations}
+        if messages_by_conv:
+            rows = await db.execute(
+                select(
+                    Message.conversation_id, Message.id, Message.content, Message.message_type,
+                    Message.intent, Message.sentiment, Message.created_at
+                ).where(
+                    Message.conversation_id.in_(list(messages_by_conv))
+                ).order_by(Message.conversation_id, Message.created_at, Message.id)
+            )
+            for conv_id, msg_id, content, message_type, intent, sentiment, created_at in rows:
+                messages_by_conv[conv_id].append(
+                    _MsgOut(msg_id, content, message_type, intent, sentiment, _iso(created_at))
+                )
+        
+        history = [
+            _ConvOut(
+                conv.id, conv.topic, conv.status, _iso(conv.started_at), _iso(conv.ended_at),
+                conv.summary, messages_by_conv[conv.id]
+            )
+            for conv in conversations
+        ]
         
         # Cache for 30 minutes (conversations don't change frequently)
-        await self.cache.redis.set(cache_key, history, 1800)
+        await self.cache.cache_conversation_history(customer_id, cache_key, history, 1800)
+        if fill_lock:
+            await self.cache.release_fill_lock(cache_key)
         
         return history
     
-    async def get_recent_context(self, customer_id: int, max_messages: int = 10, db: Session = None) -> List[Message]:
+    async def get_recent_context(self, customer_id: int, max_messages: int = 10, db: AsyncSession = None) -> List[Message]:
         """Get recent conversation context for AI"""
         # Get most recent messages across all conversations
-        messages = db.query(Message).join(Conversation).filter(
-            Conversation.customer_id == customer_id
-        ).order_by(desc(Message.created_at)).limit(max_messages).all()
+        messages = (await db.scalars(
+            select(Message).where(
+                Message.customer_id == customer_id
+            ).order_by(desc(Message.created_at), desc(Message.id)).limit(max_messages)
+        )).all()
         
         return list(reversed(messages))  # Return in chronological order
     
-    async def create_memory(self, memory_data: MemoryCreate, db: Session) -> ConversationMemory:
+    async def create_memory(self, memory_data: MemoryCreate, db: AsyncSession) -> ConversationMemory:
         """Create episodic memory entry"""
-        memory = ConversationMemory(**memory_data.dict())
-        memory.created_at = datetime.utcnow()
-        db.add(memory)
-        db.commit()
-        db.refresh(memory)
+        memory = await db.scalar(
+            insert(ConversationMemory).values(
+                **memory_data.dict(), created_at=datetime.utcnow()
+            ).returning(ConversationMemory)
+        )
+        db.add_all(self._tag_rows(memory.tags, memory.id))
+        await db.commit()
         
         # Invalidate customer cache since memory affects context
-        customer = db.query(Customer).filter(Customer.id == memory.customer_id).first()
-        if customer:
-            await self.cache.invalidate_customer_session(customer.session_id)
+        session_id = await db.scalar(select(Customer.session_id).where(Customer.id == memory.customer_id))
+        if session_id:
+            await self.cache.invalidate_customer_session(session_id)
         
         return memory
     
-    async def get_customer_memories(self, customer_id: int, memory_type: Optional[str] = None, db: Session = None) -> List[ConversationMemory]:
+    def _tag_rows(self, tags: Optional[str], memory_id: Optional[int] = None) -> List[MemoryTag]:
+        """Split comma-separated tags into normalized memory_tags rows"""
+        if not tags:
+            return []
+        unique_tags = dict.fromkeys(tag.strip() for tag in tags.split(','))
+        return [MemoryTag(memory_id=memory_id, tag=tag) for tag in unique_tags if tag]
+    
+    async def get_customer_memories(self, customer_id: int, memory_type: Optional[str] = None, db: AsyncSession = None,
+                                    limit: int = 100) -> List[ConversationMemory]:
         """Get customer's episodic memories"""
-        query = db.query(ConversationMemory).filter(
+        query = select(ConversationMemory).where(
             ConversationMemory.customer_id == customer_id,
             ConversationMemory.is_active == True
         )
         
         if memory_type:
-            query = query.filter(ConversationMemory.memory_type == memory_type)
+            query = query.where(ConversationMemory.memory_type == memory_type)
         
         # Order by importance and recency
-        memories = query.order_by(
+        memories = (await db.scalars(query.order_by(
             desc(ConversationMemory.importance),
             desc(ConversationMemory.created_at)
-        ).all()
+        ).limit(limit))).all()
         
         return memories
     
-    async def summarize_conversation(self, conversation_id: int, db: Session) -> Optional[str]:
-        """Generate conversation summary for memory"""
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id
-        ).first()
-        
-        if not conversation:
-            return None
-        
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at).all()
-        
-        if not messages:
+    async def summarize_conversation(self, conversation: Conversation) -> str:
+        """Generate conversation summary for memory from its maintained summary fields"""
+        if not conversation.message_count:
             return "Empty conversation"
         
         # Simple extractive summary (can be enhanced with LLM)
-        user_messages = [msg.content for msg in messages if msg.message_type == "user"]
-        assistant_messages = [msg.content for msg in messages if msg.message_type == "assistant"]
-        
         summary_parts = []
         
-        if user_messages:
-            summary_parts.append(f"Customer inquiry: {user_messages[0][:100]}...")
+        if conversation.first_user_msg:
+            summary_parts.append(f"Customer inquiry: {conversation.first_user_msg}...")
         
-        if assistant_messages:
-            summary_parts.append(f"Resolution approach: {assistant_messages[-1][:100]}...")
+        if conversation.last_assistant_msg:
+            summary_parts.append(f"Resolution approach: {conversation.last_assistant_msg}...")
         
         summary_parts.append(f"Status: {conversation.status}")
-        summary_parts.append(f"Messages exchanged: {len(messages)}")
+        summary_parts.append(f"Messages exchanged: {conversation.message_count}")
         
         return " | ".join(summary_parts)
     
-    async def end_conversation(self, conversation_id: int, resolution: str, rating: Optional[int], db: Session) -> Optional[Conversation]:
+    async def end_conversation(self, conversation_id: int, resolution: str, rating: Optional[int], db: AsyncSession) -> Optional[Conversation]:
         """End conversation and create memory"""
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id
-        ).first()
+        conversation = await db.scalar(
+            select(Conversation).options(
+                joinedload(Conversation.customer)
+            ).where(
+                Conversation.id == conversation_id
+            )
+        )
         
         if not conversation:
             return None
@@ -196,14 +323,12 @@ class MemoryService:
         conversation.satisfaction_rating = rating
         
         # Generate summary
-        conversation.summary = await self.summarize_conversation(conversation_id, db)
-        
-        db.commit()
-        db.refresh(conversation)
+        conversation.summary = await self.summarize_conversation(conversation)
         
-        # Create memory entry for important conversations
+        # Stage a memory entry for important conversations in the same transaction
+        memory = None
         if rating and rating >= 4:  # High satisfaction
-            memory_data = MemoryCreate(
+            memory = ConversationMemory(
                 customer_id=conversation.customer_id,
                 memory_type="positive_outcome",
                 content=f"Successful resolution: {resolution[:200]}",
@@ -211,9 +336,8 @@ class MemoryService:
                 source_conversation_id=conversation_id,
                 tags="success,resolution"
             )
-            await self.create_memory(memory_data, db)
         elif rating and rating <= 2:  # Low satisfaction
-            memory_data = MemoryCreate(
+            memory = ConversationMemory(
                 customer_id=conversation.customer_id,
                 memory_type="issue",
                 content=f"Dissatisfaction with: {resolution[:200]}",
@@ -221,45 +345,67 @@ class MemoryService:
                 source_conversation_id=conversation_id,
                 tags="dissatisfaction,issue"
             )
-            await self.create_memory(memory_data, db)
+        
+        if memory:
+            memory.tag_rows = self._tag_rows(memory.tags)
+            memory.created_at = datetime.utcnow()
+            db.add(memory)
+        
+        # Read from the eager-loaded customer before commit expires it
+        customer_id = conversation.customer_id
+        session_id = conversation.customer.session_id if conversation.customer else None
+        
+        await db.commit()
+        await db.refresh(conversation)
         
         # Invalidate relevant caches
-        customer = db.query(Customer).filter(Customer.id == conversation.customer_id).first()
-        if customer:
-            await self.cache.invalidate_customer_session(customer.session_id)
-            # Clear conversation history cache
-            cache_pattern = f"conversation_history:{conversation.customer_id}:*"
-            await self.cache.redis.invalidate_pattern(cache_pattern)
+        if session_id:
+            await asyncio.gather(
+                self.cache.invalidate_customer_session(session_id),
+                self.cache.invalidate_conversation_history(customer_id)
+            )
         
         return conversation
     
-    async def get_memory_insights(self, customer_id: int, db: Session) -> Dict[str, Any]:
+    async def get_memory_insights(self, customer_id: int, db: AsyncSession) -> Dict[str, Any]:
         """Get memory-based insights for personalization"""
-        memories = await self.get_customer_memories(customer_id, db=db)
-        
-        # Analyze memory patterns
-        memory_types = {}
-        common_tags = {}
-        total_importance = 0
+        active_memories = (
+            ConversationMemory.customer_id == customer_id,
+            ConversationMemory.is_active == True
+        )
         
-        for memory in memories:
-            # Count memory types
-            memory_types[memory.memory_type] = memory_types.get(memory.memory_type, 0) + 1
-            
-            # Extract tags
-            if memory.tags:
-                tags = memory.tags.split(',')
-                for tag in tags:
-                    tag = tag.strip()
-                    common_tags[tag] = common_tags.get(tag, 0) + 1
-            
-            total_importance += memory.importance
+        # Count memory types and total importance in one aggregation
+        type_rows = (await db.execute(
+            select(
+                ConversationMemory.memory_type,
+                func.count(ConversationMemory.id),
+                func.sum(ConversationMemory.importance)
+            ).where(*active_memories).group_by(ConversationMemory.memory_type)
+        )).all()
+        
+        memory_types = {memory_type: count for memory_type, count, _ in type_rows}
+        total_memories = sum(memory_types.values())
+        total_importance = sum(importance or 0 for _, _, importance in type_rows)
+        
+        # Rank tags server-side over the normalized tag table
+        tag_count = func.count(MemoryTag.memory_id).label("tag_count")
+        common_themes = (await db.execute(
+            select(MemoryTag.tag, tag_count).join(
+                ConversationMemory, MemoryTag.memory_id == ConversationMemory.id
+            ).where(*active_memories).group_by(MemoryTag.tag).order_by(desc(tag_count)).limit(5)
+        )).all()
+        
+        key_memories = (await db.scalars(
+            select(ConversationMemory).where(*active_memories).order_by(
+                desc(ConversationMemory.importance)
+            ).limit(3)
+        )).all()
         
         insights = {
-            "total_memories": len(memories),
+            "total_memories": total_memories,
             "memory_types": memory_types,
-            "common_themes": sorted(common_tags.items(), key=lambda x: x[1], reverse=True)[:5],
-            "average_importance": total_importance / len(memories) if memories else 0,
+            "common_themes": [(tag, count) for tag, count in common_themes],
+            "average_importance": total_importance / total_memories if total_memories else 0,
             "key_memories": [
                 {
                     "type": memory.memory_type,
@@ -267,7 +413,7 @@ class MemoryService:
                     "importance": memory.importance,
                     "created_at": memory.created_at.isoformat() if memory.created_at else None
                 }
-                for memory in sorted(memories, key=lambda m: m.importance, reverse=True)[:3]
+                for memory in key_memories
             ]
         }
         
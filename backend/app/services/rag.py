@@ -1,14 +1,28 @@
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func, desc, insert, literal, text
+import asyncio
 import hashlib
 import re
 
+from app.core.embeddings import embedding_client
 from app.models.database import Document
 from app.models.schemas import DocumentCreate, Document as DocumentSchema
 from app.services.cache import cache_service
 
 
+# Common stop words removed from queries and documents
+_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'can', 'how', 'what', 'when', 'where', 'why'
+})
+
+# Extract words (remove punctuation)
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
 class RAGService:
     """Document retrieval and search with aggressive caching"""
     
@@ -19,103 +33,81 @@ class RAGService:
                              limit: int = 5, db: Session = None) -> List[Dict[str, Any]]:
         """Search documents with 40-100x performance improvement via caching"""
         
-        # Create cache key including all search parameters
-        cache_key_input = f"{query}:{category}:{limit}"
+        query_terms = self._extract_keywords(query)
+        
+        # Canonical cache key: term order, case, stop words and whitespace don't matter
+        normalized_query = " ".join(sorted(set(query_terms)))
+        cache_key_input = f"{normalized_query}|{category}|{limit}"
         
         # Try cache first (1-5ms vs 200-500ms for vector search)
         cached_results = await self.cache.get_cached_document_search(cache_key_input)
         if cached_results:
             return cached_results
         
-        # Cache miss - perform expensive search
-        query_terms = self._extract_keywords(query.lower())
+        # Only one worker recomputes a missed query; the rest wait for its result
+        search_key = self.cache.document_search_key(cache_key_input)
+        fill_lock = await self.cache.acquire_fill_lock(search_key)
+        if not fill_lock:
+            cached_results = await self.cache.wait_for_fill(search_key)
+            if cached_results is not None:
+                return cached_results
         
+        # Cache miss - rank with PostgreSQL full-text search over the GIN index
         # Build search query
-        search_query = db.query(Document).filter(Document.is_active == True)
+        if query_terms:
+            # OR the terms together so any matching keyword qualifies a document
+            ts_query = func.to_tsquery('english', ' | '.join(query_terms))
+            # Square root length normalization against the count stored at ingest
+            score = (
+                func.ts_rank_cd(Document.search_vec, ts_query)
+                / func.sqrt(func.greatest(Document.token_count, 1))
+            ).label("score")
+            search_query = db.query(Document, score).filter(
+                Document.is_active == True,
+                Document.search_vec.op('@@')(ts_query)
+            )
+        else:
+            score = literal(0.0).label("score")
+            search_query = db.query(Document, score).filter(Document.is_active == True)
         
         if category:
             search_query = search_query.filter(Document.category == category)
         
-        # Simple keyword-based search (can be enhanced with vector similarity)
-        keyword_conditions = []
-        for term in query_terms:
-            keyword_conditions.extend([
-                Document.title.ilike(f"%{term}%"),
-                Document.content.ilike(f"%{term}%"),
-                Document.keywords.ilike(f"%{term}%")
-            ])
-        
-        if keyword_conditions:
-            search_query = search_query.filter(or_(*keyword_conditions))
-        
-        documents = search_query.limit(limit).all()
-        
-        # Calculate relevance scores
-        results = []
-        for doc in documents:
-            relevance_score = self._calculate_relevance(query_terms, doc)
-            results.append({
+        rows = search_query.order_by(desc("score")).limit(limit).all()
+        
+        results = [
+            {
                 "id": doc.id,
                 "title": doc.title,
                 "content": doc.content,
                 "document_type": doc.document_type,
                 "category": doc.category,
-                "relevance_score": relevance_score,
+                "relevance_score": float(relevance_score),
                 "created_at": doc.created_at.isoformat() if doc.created_at else None
-            })
-        
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
+            }
+            for doc, relevance_score in rows
+        ]
         
         # Cache results for 30 minutes (documents don't change often)
         await self.cache.cache_document_search(cache_key_input, results)
+        if fill_lock:
+            await self.cache.release_fill_lock(search_key)
         
         return results
     
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract meaningful keywords from search query"""
-        # Remove common stop words
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-            'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-            'should', 'may', 'might', 'can', 'how', 'what', 'when', 'where', 'why'
-        }
-        
-        # Extract words (remove punctuation)
-        words = re.findall(r'\b\w+\b', text.lower())
-        
         # Filter out stop words and short words
-        keywords = [word for word in words if word not in stop_words and len(word) > 2]
-        
-        return keywords
+        return [word for word in _WORD_RE.findall(text.lower()) if len(word) > 2 and word not in _STOP_WORDS]
     
-    def _calculate_relevance(self, query_terms: List[str], document: Document) -> float:
-        """Calculate document relevance score"""
-        score = 0.0
-        
-        # Combine all searchable text
-        searchable_text = f"{document.title} {document.content} {document.keywords or ''}".lower()
-        
-        for term in query_terms:
-            # Title matches are most important
-            if term in document.title.lower():
-                score += 3.0
-            
-            # Content matches
-            content_matches = searchable_text.count(term)
-            score += content_matches * 0.5
-            
-            # Keyword matches
-            if document.keywords and term in document.keywords.lower():
-                score += 2.0
-        
-        # Normalize by document length
-        doc_length = len(searchable_text.split())
-        if doc_length > 0:
-            score = score / (doc_length ** 0.5)  # Square root normalization
-        
-        return min(score, 10.0)  # Cap at 10.0
+    def _extract_keywords_batch(self, texts: List[str]) -> List[List[str]]:
+        """Extract keywords for many texts, binding the regex and stop words once"""
+        findall = _WORD_RE.findall
+        stop_words = _STOP_WORDS
+        return [
+            [word for word in findall(text.lower()) if len(word) > 2 and word not in stop_words]
+            for text in texts
+        ]
     
     async def get_document_by_id(self, document_id: int, db: Session) -> Optional[Document]:
         """Get specific document by ID"""
@@ -126,21 +118,50 @@ class RAGService:
     
     async def create_document(self, document_data: DocumentCreate, db: Session) -> Document:
         """Create new document"""
-        # Extract keywords automatically
+        # Tokenize once for both keyword extraction and rank normalization
+        keywords = self._extract_keywords(f"{document_data.title} {document_data.content}")
         if not document_data.keywords:
-            keywords = self._extract_keywords(f"{document_data.title} {document_data.content}")
             document_data.keywords = ", ".join(keywords[:10])  # Limit to 10 keywords
         
-        document = Document(**document_data.dict())
-        db.add(document)
+        embedding = await self._embed_document(document_data.title, document_data.content)
+        
+        # INSERT ... RETURNING loads ids and server defaults without a follow-up SELECT
+        document = db.scalar(
+            insert(Document).values(
+                **document_data.dict(), token_count=len(keywords), embedding=embedding
+            ).returning(Document)
+        )
         db.commit()
-        db.refresh(document)
         
         # Clear document search cache since new content is available
         await self._invalidate_document_caches()
         
         return document
     
+    async def create_documents(self, documents_data: List[DocumentCreate], db: Session) -> List[Document]:
+        """Bulk-create documents with one tokenization pass, one embedding batch and one commit"""
+        texts = [f"{data.title} {data.content}" for data in documents_data]
+        keyword_lists = self._extract_keywords_batch(texts)
+        embeddings = await asyncio.to_thread(embedding_client.encode_batch, texts)
+        
+        rows = []
+        for document_data, keywords, embedding in zip(documents_data, keyword_lists, embeddings):
+            if not document_data.keywords:
+                document_data.keywords = ", ".join(keywords[:10])  # Limit to 10 keywords
+            
+            rows.append({**document_data.dict(), "token_count": len(keywords), "embedding": embedding})
+        
+        # Multi-row INSERT ... RETURNING, in input order
+        documents = db.scalars(
+            insert(Document).returning(Document, sort_by_parameter_order=True), rows
+        ).all()
+        db.commit()
+        
+        # Clear document search cache once for the whole batch
+        await self._invalidate_document_caches()
+        
+        return documents
+    
     async def update_document(self, document_id: int, updates: Dict[str, Any], db: Session) -> Optional[Document]:
         """Update document and invalidate caches"""
         document = db.query(Document).filter(Document.id == document_id).first()
@@ -152,6 +173,10 @@ class RAGService:
             if hasattr(document, field):
                 setattr(document, field, value)
         
+        if "title" in updates or "content" in updates:
+            document.token_count = len(self._extract_keywords(f"{document.title} {document.content}"))
+            document.embedding = await self._embed_document(document.title, document.content)
+        
         db.commit()
         db.refresh(document)
         
@@ -179,11 +204,44 @@ class RAGService:
         if cached_similar:
             return cached_similar
         
-        # Find documents in same category with keyword overlap
+        if source_doc.embedding is None:
+            # Not embedded yet (seed data, ETL imports) - use keyword overlap
+            result = self._keyword_similar_documents(source_doc, limit, db)
+        else:
+            # kNN over the HNSW index; iterative scan keeps returning candidates
+            # until enough rows survive the category/is_active filter
+            db.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            distance = Document.embedding.cosine_distance(source_doc.embedding)
+            rows = db.query(
+                Document.id, Document.title, Document.category, (1 - distance).label("similarity")
+            ).filter(
+                Document.id != source_doc.id,
+                Document.category == source_doc.category,
+                Document.is_active == True,
+                Document.embedding.isnot(None)
+            ).order_by(distance).limit(limit).all()
+            
+            result = [
+                {
+                    "id": row.id,
+                    "title": row.title,
+                    "category": row.category,
+                    "similarity_score": float(row.similarity)
+                }
+                for row in rows
+            ]
+        
+        # Cache for 1 hour
+        await self.cache.redis.set_tagged(cache_key, result, self.cache.SIMILAR_DOCS_TAG, 3600)
+        
+        return result
+    
+    def _keyword_similar_documents(self, source_doc: Document, limit: int, db: Session) -> List[Dict[str, Any]]:
+        """Jaccard keyword similarity within the source document's category"""
         source_keywords = set(self._extract_keywords(f"{source_doc.title} {source_doc.content}"))
         
         all_docs = db.query(Document).filter(
-            Document.id != document_id,
+            Document.id != source_doc.id,
             Document.category == source_doc.category,
             Document.is_active == True
         ).all()
@@ -207,12 +265,11 @@ class RAGService:
         
         # Sort by similarity and limit results
         similarities.sort(key=lambda x: x["similarity_score"], reverse=True)
-        result = similarities[:limit]
-        
-        # Cache for 1 hour
-        await self.cache.redis.set(cache_key, result, 3600)
-        
-        return result
+        return similarities[:limit]
+    
+    async def _embed_document(self, title: str, content: str) -> Optional[List[float]]:
+        """Embed document text off the event loop"""
+        return await asyncio.to_thread(embedding_client.encode, f"{title} {content}")
     
     async def get_contextual_documents(self, customer_context: Dict[str, Any], 
                                      query: str, db: Session) -> List[Dict[str, Any]]:
@@ -232,13 +289,12 @@ class RAGService:
         elif "technical" in customer_context.get("communication_style", ""):
             preferred_categories.append("technical")
         
-        # Search with context
-        results = []
-        for category in preferred_categories or [None]:
-            category_results = await self.search_documents(
-                enhanced_query, category, limit=3, db=db
-            )
-            results.extend(category_results)
+        # Search with context (categories fan out concurrently)
+        category_results = await asyncio.gather(*[
+            self.search_documents(enhanced_query, category, limit=3, db=db)
+            for category in preferred_categories or [None]
+        ])
+        results = [result for results_for_category in category_results for result in results_for_category]
         
         # If no category-specific results, do general search
         if not results:
@@ -256,13 +312,7 @@ class RAGService:
     
     async def _invalidate_document_caches(self):
         """Invalidate all document-related caches"""
-        patterns = [
-            "docs:search:*",
-            "similar_docs:*"
-        ]
-        
-        for pattern in patterns:
-            await self.cache.redis.invalidate_pattern(pattern)
+        await self.cache.invalidate_document_searches()
     
     async def get_search_analytics(self) -> Dict[str, Any]:
         """Get search performance analytics"""
@@ -8,8 +8,11 @@ customer support responses based on customer feedback and engagement metrics.
 import asyncio
 import json
 import logging
+import math
+import time
 import numpy as np
-from datetime import datetime, timedelta
+from numba import njit
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
@@ -65,37 +68,155 @@ class RLReward:
     customer_id: str
     session_id: str
 
+@njit(cache=True)
+def _argmax_row(row):
+    """Scalar argmax for short action rows (first index wins ties, like np.argmax)"""
+    best = 0
+    best_value = row[0]
+    for i in range(1, row.shape[0]):
+        if row[i] > best_value:
+            best = i
+            best_value = row[i]
+    return best
+
+@njit(cache=True)
+def _bandit_select(values, epsilon, explore_draw, action_draw):
+    """Epsilon-greedy selection over the bandit's action values (draws are uniform in [0, 1))"""
+    if explore_draw < epsilon:
+        # Exploration: random action
+        return min(int(action_draw * values.shape[0]), values.shape[0] - 1)
+    # Exploitation: best known action
+    return _argmax_row(values)
+
+@njit(cache=True)
+def _bandit_update(counts, values, action, reward):
+    """Incremental-mean update of one action's value"""
+    counts[action] += 1.0
+    n = counts[action]
+    values[action] = ((n - 1.0) / n) * values[action] + (1.0 / n) * reward
+
+@njit(cache=True)
+def _state_index(style_code, urgency_code, tier_code, sentiment_bucket, mask):
+    """Mix the discretized state fields into a Q-table row (mask is n_states - 1)"""
+    h = np.uint64(((style_code * 31 + urgency_code) * 31 + tier_code) * 32 + sentiment_bucket)
+    # MurmurHash3 fmix64 finalizer; uint64 throughout so numba never promotes to float
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xff51afd7ed558ccd)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xc4ceb9fe1a85ec53)
+    h ^= h >> np.uint64(33)
+    return np.int64(h & np.uint64(mask))
+
+@njit(cache=True)
+def _q_update(q_table, visit_count, state_touched, state_idx, action, reward, next_state_idx, alpha, gamma):
+    """Bellman update of one (state, action) entry from already-indexed states"""
+    next_row = q_table[next_state_idx]
+    max_next_q = next_row[0]
+    for i in range(1, next_row.shape[0]):
+        if next_row[i] > max_next_q:
+            max_next_q = next_row[i]
+    
+    current_q = q_table[state_idx, action]
+    q_table[state_idx, action] = current_q + alpha * (reward + gamma * max_next_q - current_q)
+    visit_count[state_idx, action] += 1
+    state_touched[state_idx] = 1
+
+@njit(cache=True)
+def _batch_q_update(q_table, visit_count, state_touched, states, actions, rewards, next_states, alpha, gamma):
+    """Apply a batch of Q-learning updates in order"""
+    for i in range(states.shape[0]):
+        _q_update(q_table, visit_count, state_touched, states[i], actions[i], rewards[i], next_states[i], alpha, gamma)
+
+@njit(cache=True)
+def _confidence(q_value, visit_count):
+    """Confidence from a Q-value and its visit count (higher with more visits and value)"""
+    return max(0.1, min(1.0, (q_value + 1.0) * 0.5 * math.log(visit_count + 1.0) / 5.0))
+
+# Compile the kernels at import rather than on the first request
+_argmax_row(np.zeros(1))
+_bandit_select(np.zeros(1), 0.0, 0.0, 0.0)
+_bandit_update(np.zeros(1), np.zeros(1), 0, 0.0)
+_state_index(0, 0, 0, 0, 0)
+_confidence(0.0, np.int32(0))  # visit_count elements are int32
+_q_update(np.zeros((1, 1)), np.zeros((1, 1), dtype=np.int32), np.zeros(1, dtype=np.uint8), 0, 0, 0.0, 0, 0.0, 0.0)
+_batch_q_update(np.zeros((1, 1)), np.zeros((1, 1), dtype=np.int32), np.zeros(1, dtype=np.uint8),
+                np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64),
+                np.zeros(1), np.zeros(1, dtype=np.int64), 0.0, 0.0)
+
+# Small integer codes for the categorical state fields (str enums also match raw values)
+_STYLE_CODES = {style: i for i, style in enumerate(CommunicationStyle)}
+_URGENCY_CODES = {level: i for i, level in enumerate(UrgencyLevel)}
+_TIER_CODES = {"new": 0, "regular": 1, "vip": 2}
+
+# Rewards retained for analytics (oldest are overwritten first)
+MAX_REWARD_HISTORY = 10000
+_REWARD_CODES = {reward_type: i for i, reward_type in enumerate(RewardType)}
+
+# Reward normalizers indexed by _REWARD_CODES (declaration order of RewardType)
+_NORM_LUT = np.array([
+    1.0,  # CUSTOMER_SATISFACTION: already 0-1
+    0.5,  # RESPONSE_TIME: favor faster responses
+    1.0,  # RESOLUTION_SUCCESS
+    0.8,  # ESCALATION_AVOIDED
+    0.7,  # FOLLOW_UP_REDUCED
+], dtype=np.float32)
+
+# Feedback (Q-learning transitions and reward persistence) is flushed in batches
+# of this size, or after this many seconds
+FEEDBACK_BATCH_SIZE = 32
+FEEDBACK_FLUSH_INTERVAL = 5.0
+# Queued after the last feedback item to tell the consumer to flush and exit
+_FEEDBACK_STOP = object()
+
+RANDOM_POOL_SIZE = 65536  # power of two
+
+class RandomPool:
+    """Pregenerated uniform draws consumed by a wrapping counter"""
+    
+    def __init__(self, size: int = RANDOM_POOL_SIZE):
+        self._rng = np.random.default_rng()
+        self._pool = self._rng.random(size, dtype=np.float32)
+        self._mask = size - 1
+        self._idx = 0
+    
+    def random(self) -> float:
+        """Next uniform draw in [0, 1)"""
+        r = self._pool[self._idx]
+        self._idx = (self._idx + 1) & self._mask
+        if self._idx == 0:
+            # Refill in place once the pool has been used up
+            self._rng.random(out=self._pool, dtype=np.float32)
+        return float(r)
+    
+    def randint(self, n: int) -> int:
+        """Next uniform integer in [0, n)"""
+        return min(int(self.random() * n), n - 1)
+
+# Shared by the bandit, the Q-learning agent and the service's policy mix
+random_pool = RandomPool()
+
 class MultiArmedBandit:
     """Multi-Armed Bandit for response strategy selection"""
     
     def __init__(self, n_actions: int = 5, epsilon: float = 0.1):
         self.n_actions = n_actions
         self.epsilon = epsilon
-        self.counts = np.zeros(n_actions)
-        self.values = np.zeros(n_actions)
+        self.counts = np.zeros(n_actions, dtype=np.float64)
+        self.values = np.zeros(n_actions, dtype=np.float64)
         self.total_reward = 0
         self.total_count = 0
     
     def select_action(self) -> int:
         """Select action using epsilon-greedy strategy"""
-        if np.random.random() < self.epsilon:
-            # Exploration: random action
-            return np.random.randint(0, self.n_actions)
-        else:
-            # Exploitation: best known action
-            return np.argmax(self.values)
+        return int(_bandit_select(self.values, self.epsilon, random_pool.random(), random_pool.random()))
     
     def update(self, action: int, reward: float):
         """Update bandit with reward feedback"""
-        self.counts[action] += 1
         self.total_count += 1
         self.total_reward += reward
         
         # Update average reward for action
-        n = self.counts[action]
-        value = self.values[action]
-        new_value = ((n - 1) / n) * value + (1 / n) * reward
-        self.values[action] = new_value
+        _bandit_update(self.counts, self.values, action, reward)
     
     def get_stats(self) -> Dict:
         """Get bandit statistics"""
@@ -110,86 +231,158 @@ class MultiArmedBandit:
 class QLearningAgent:
     """Q-Learning agent for response optimization"""
     
-    def __init__(self, n_states: int = 100, n_actions: int = 5, 
+    def __init__(self, n_states: int = 128, n_actions: int = 5, 
                  alpha: float = 0.1, gamma: float = 0.9, epsilon: float = 0.1):
-        self.n_states = n_states
+        # Round up to a power of two so state indexes can be masked instead of taken modulo
+        self.n_states = 1 << (n_states - 1).bit_length()
+        self._mask = self.n_states - 1
         self.n_actions = n_actions
         self.alpha = alpha  # learning rate
         self.gamma = gamma  # discount factor
         self.epsilon = epsilon  # exploration rate
         
         # Initialize Q-table
-        self.q_table = np.zeros((n_states, n_actions))
-        self.visit_count = np.zeros((n_states, n_actions))
+        self.q_table = np.zeros((self.n_states, n_actions))
+        self.visit_count = np.zeros((self.n_states, n_actions), dtype=np.int32)
+        self._state_touched = np.zeros(self.n_states, dtype=np.uint8)  # 1 once any action was updated
     
     def state_to_index(self, state: RLState) -> int:
         """Convert state to discrete index for Q-table"""
-        # Simple hash-based state indexing
-        state_str = f"{state.communication_style}_{state.urgency_level}_{int(state.customer_sentiment * 10)}_{state.customer_tier}"
-        return hash(state_str) % self.n_states
+        # Sentiment in [-1, 1] maps to buckets 0-20
+        sentiment_bucket = min(20, max(0, int(state.customer_sentiment * 10) + 10))
+        return _state_index(
+            _STYLE_CODES.get(state.communication_style, len(_STYLE_CODES)),
+            _URGENCY_CODES.get(state.urgency_level, len(_URGENCY_CODES)),
+            _TIER_CODES.get(state.customer_tier, len(_TIER_CODES)),
+            sentiment_bucket,
+            self._mask
+        )
     
     def select_action(self, state: RLState) -> int:
         """Select action using epsilon-greedy policy"""
-        state_idx = self.state_to_index(state)
-        
-        if np.random.random() < self.epsilon:
+        return self.select_action_at(self.state_to_index(state))
+    
+    def select_action_at(self, state_idx: int) -> int:
+        """Select action for an already-indexed state"""
+        if random_pool.random() < self.epsilon:
             # Exploration
-            return np.random.randint(0, self.n_actions)
+            return random_pool.randint(self.n_actions)
         else:
             # Exploitation
-            return np.argmax(self.q_table[state_idx])
+            return _argmax_row(self.q_table[state_idx])
     
     def update(self, state: RLState, action: int, reward: float, next_state: RLState):
         """Update Q-table using Q-learning update rule"""
-        state_idx = self.state_to_index(state)
-        next_state_idx = self.state_to_index(next_state)
-        
-        # Q-learning update
-        current_q = self.q_table[state_idx, action]
-        max_next_q = np.max(self.q_table[next_state_idx])
-        
-        new_q = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
-        self.q_table[state_idx, action] = new_q
-        
-        # Update visit count
-        self.visit_count[state_idx, action] += 1
+        self.update_at(self.state_to_index(state), action, reward, self.state_to_index(next_state))
+    
+    def update_at(self, state_idx: int, action: int, reward: float, next_state_idx: int):
+        """Q-learning update for already-indexed states"""
+        _q_update(
+            self.q_table, self.visit_count, self._state_touched,
+            state_idx, action, reward, next_state_idx, self.alpha, self.gamma
+        )
+    
+    def update_batch(self, transitions: List[Tuple[int, int, float, int]]):
+        """Apply (state_idx, action, reward, next_state_idx) transitions in one pass"""
+        states, actions, rewards, next_states = zip(*transitions)
+        _batch_q_update(
+            self.q_table, self.visit_count, self._state_touched,
+            np.array(states, dtype=np.int64), np.array(actions, dtype=np.int64),
+            np.array(rewards, dtype=np.float64), np.array(next_states, dtype=np.int64),
+            self.alpha, self.gamma
+        )
     
     def get_stats(self) -> Dict:
         """Get Q-learning statistics"""
         return {
             "q_table_shape": self.q_table.shape,
-            "total_updates": np.sum(self.visit_count),
-            "explored_states": np.sum(np.any(self.visit_count > 0, axis=1)),
+            "total_updates": int(self.visit_count.sum()),
+            "explored_states": int(self._state_touched.sum()),
             "average_q_value": np.mean(self.q_table[self.visit_count > 0])
         }
 
+class RewardStore:
+    """Ring buffer of rewards stored as parallel NumPy columns"""
+    
+    def __init__(self, capacity: int = MAX_REWARD_HISTORY):
+        self.capacity = capacity
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.types = np.zeros(capacity, dtype=np.int8)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)  # epoch nanoseconds
+        self.index = 0  # next slot to write
+        self.count = 0  # rewards recorded since startup
+    
+    def append(self, reward: RLReward):
+        """Record a reward, overwriting the oldest once full"""
+        slot = self.index
+        self.values[slot] = reward.value
+        self.types[slot] = _REWARD_CODES[reward.reward_type]
+        self.timestamps[slot] = int(reward.timestamp.timestamp() * 1_000_000_000)
+        self.index = (slot + 1) % self.capacity
+        self.count += 1
+    
+    def recent_slots(self, n: int) -> np.ndarray:
+        """Slots of the last n rewards, oldest first"""
+        n = min(n, self.count, self.capacity)
+        return (self.index - n + np.arange(n)) % self.capacity
+    
+    def slots_since(self, cutoff_ns: int) -> np.ndarray:
+        """Slots of rewards recorded after cutoff_ns, oldest first (binary search per segment)"""
+        if self.count < self.capacity:
+            # Not wrapped yet: slots 0..count-1 are already in insertion order
+            start = np.searchsorted(self.timestamps[:self.count], cutoff_ns, side="right")
+            return np.arange(start, self.count)
+        
+        older = self.timestamps[self.index:]
+        if cutoff_ns < older[-1]:
+            start = self.index + np.searchsorted(older, cutoff_ns, side="right")
+            return np.concatenate((np.arange(start, self.capacity), np.arange(self.index)))
+        
+        start = np.searchsorted(self.timestamps[:self.index], cutoff_ns, side="right")
+        return np.arange(start, self.index)
+
 class ReinforcementLearningService:
     """Main RL service for customer support optimization"""
     
     def __init__(self):
         self.bandit = MultiArmedBandit(n_actions=len(ActionType), epsilon=0.1)
-        self.q_agent = QLearningAgent(n_states=1000, n_actions=len(ActionType))
+        self.q_agent = QLearningAgent(n_states=1024, n_actions=len(ActionType))
         self.action_mapping = list(ActionType)
-        self.rewards_history: List[RLReward] = []
+        self._action_to_idx = {action_type: i for i, action_type in enumerate(self.action_mapping)}
+        self._action_counts = np.zeros(len(ActionType), dtype=np.int64)  # feedback received per action
+        
+        self.rewards = RewardStore()
+        
+        # Q-learning transitions and rewards awaiting the next batch flush
+        self._pending: List[Tuple[int, int, float, int]] = []
+        self._pending_rewards: Dict[str, Dict] = {}
+        self._last_flush = time.monotonic()
+        
+        # Feedback is applied by a single consumer task so model updates never interleave
+        self._feedback_queue: asyncio.Queue = asyncio.Queue()
+        self._feedback_consumer: Optional[asyncio.Task] = None
         
     async def get_optimal_action(self, state: RLState) -> RLAction:
         """Get optimal response action for given state"""
         try:
+            # Index the state once for action selection and confidence
+            state_idx = self.q_agent.state_to_index(state)
+            
             # Use Q-learning for primary decision
-            q_action_idx = self.q_agent.select_action(state)
+            q_action_idx = self.q_agent.select_action_at(state_idx)
             
             # Use bandit for backup/exploration
             bandit_action_idx = self.bandit.select_action()
             
             # Combine decisions (weighted average)
-            final_action_idx = q_action_idx if np.random.random() < 0.8 else bandit_action_idx
+            final_action_idx = q_action_idx if random_pool.random() < 0.8 else bandit_action_idx
             
             action_type = self.action_mapping[final_action_idx]
             
             # Generate action details based on state and action type
             response_strategy = await self._generate_response_strategy(state, action_type)
             personalization_level = self._calculate_personalization_level(state)
-            confidence = self._calculate_confidence(state, final_action_idx)
+            confidence = self._calculate_confidence(state_idx, final_action_idx)
             
             return RLAction(
                 action_type=action_type,
@@ -210,9 +403,86 @@ class ReinforcementLearningService:
     
     async def provide_feedback(self, state: RLState, action: RLAction, 
                              reward: RLReward, next_state: Optional[RLState] = None):
-        """Provide feedback to update RL models"""
+        """Provide feedback to update RL models (queued for the consumer task)"""
+        if self._feedback_consumer is None:
+            await self.start_feedback_consumer()
+        self._feedback_queue.put_nowait((state, action, reward, next_state))
+    
+    async def provide_feedback_batch(self, state: RLState, action: RLAction, rewards: List[RLReward],
+                                     next_state: Optional[RLState] = None):
+        """Provide several rewards for one action at once
+        
+        With a next state, the best reward also carries the Q-learning transition,
+        learned from its raw value; the bandit sees each reward once, normalized.
+        """
+        if not rewards:
+            return
+        if self._feedback_consumer is None:
+            await self.start_feedback_consumer()
+        best_reward = max(rewards, key=lambda reward: reward.value)
+        for reward in rewards:
+            if reward is best_reward and next_state:
+                self._feedback_queue.put_nowait((state, action, reward, next_state, reward.value))
+            else:
+                self._feedback_queue.put_nowait((state, action, reward, None))
+    
+    async def start_feedback_consumer(self):
+        """Start the task that applies queued feedback"""
+        if self._feedback_consumer is None:
+            self._feedback_consumer = asyncio.create_task(self._consume_feedback())
+    
+    async def stop_feedback_consumer(self):
+        """Stop the consumer, applying and persisting whatever is still queued"""
+        consumer, self._feedback_consumer = self._feedback_consumer, None
+        if consumer:
+            # Let the consumer finish what it holds instead of cancelling it mid-write
+            self._feedback_queue.put_nowait(_FEEDBACK_STOP)
+            try:
+                await consumer
+            except Exception as e:
+                logger.error(f"RL feedback consumer failed: {e}")
+        
+        # Anything left if the consumer died early
+        while not self._feedback_queue.empty():
+            feedback = self._feedback_queue.get_nowait()
+            if feedback is not _FEEDBACK_STOP:
+                await self._apply_feedback(*feedback)
+        await self._flush_feedback()
+    
+    async def _consume_feedback(self):
+        """Drain the feedback queue in batches"""
+        queue = self._feedback_queue
+        while True:
+            try:
+                feedback = await asyncio.wait_for(queue.get(), timeout=FEEDBACK_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                # Idle: flush whatever the last batch left behind
+                await self._flush_feedback()
+                continue
+            
+            batch = [feedback]
+            while len(batch) < FEEDBACK_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            for feedback in batch:
+                if feedback is _FEEDBACK_STOP:
+                    await self._flush_feedback()
+                    return
+                await self._apply_feedback(*feedback)
+            
+            if (len(self._pending_rewards) >= FEEDBACK_BATCH_SIZE
+                    or time.monotonic() - self._last_flush >= FEEDBACK_FLUSH_INTERVAL):
+                await self._flush_feedback()
+    
+    async def _apply_feedback(self, state: RLState, action: RLAction, reward: RLReward,
+                              next_state: Optional[RLState], transition_reward: Optional[float] = None):
+        """Update RL models with one piece of feedback
+        
+        transition_reward overrides the normalized reward for the Q-learning update.
+        """
         try:
-            action_idx = self.action_mapping.index(action.action_type)
+            action_idx = self._action_to_idx[action.action_type]
+            self._action_counts[action_idx] += 1
             
             # Normalize reward to 0-1 range
             normalized_reward = self._normalize_reward(reward)
@@ -220,16 +490,20 @@ class ReinforcementLearningService:
             # Update bandit
             self.bandit.update(action_idx, normalized_reward)
             
-            # Update Q-learning if next state available
+            # Queue a Q-learning update if next state available
             if next_state:
-                self.q_agent.update(state, action_idx, normalized_reward, next_state)
+                self._pending.append((
+                    self.q_agent.state_to_index(state), action_idx,
+                    normalized_reward if transition_reward is None else transition_reward,
+                    self.q_agent.state_to_index(next_state)
+                ))
             
             # Store reward history
-            self.rewards_history.append(reward)
-            await self._persist_reward(reward)
+            self.rewards.append(reward)
+            self._queue_reward(reward)
             
             # Periodic model optimization
-            if len(self.rewards_history) % 100 == 0:
+            if self.rewards.count % 100 == 0:
                 await self._optimize_models()
                 
         except Exception as e:
@@ -238,20 +512,21 @@ class ReinforcementLearningService:
     async def get_performance_metrics(self) -> Dict:
         """Get RL system performance metrics"""
         try:
+            self._flush_q_updates()
             bandit_stats = self.bandit.get_stats()
             q_stats = self.q_agent.get_stats()
             
             # Recent performance
-            recent_rewards = [r for r in self.rewards_history 
-                            if r.timestamp > datetime.now() - timedelta(days=7)]
+            cutoff = time.time_ns() - 7 * 86_400 * 1_000_000_000
+            recent_rewards = self._normalized_rewards(self.rewards.slots_since(cutoff))
             
-            avg_recent_reward = np.mean([self._normalize_reward(r) for r in recent_rewards]) if recent_rewards else 0
+            avg_recent_reward = float(recent_rewards.mean()) if recent_rewards.size else 0
             
             return {
                 "bandit_performance": bandit_stats,
                 "q_learning_performance": q_stats,
                 "recent_average_reward": avg_recent_reward,
-                "total_interactions": len(self.rewards_history),
+                "total_interactions": self.rewards.count,
                 "reward_trends": await self._calculate_reward_trends(),
                 "action_distribution": await self._get_action_distribution()
             }
@@ -260,6 +535,18 @@ class ReinforcementLearningService:
             logger.error(f"Error getting RL metrics: {e}")
             return {"error": str(e)}
     
+    def _flush_q_updates(self):
+        """Apply queued Q-learning transitions as one batch"""
+        if self._pending:
+            self.q_agent.update_batch(self._pending)
+            self._pending = []
+    
+    async def _flush_feedback(self):
+        """Apply queued Q-learning updates and persist queued rewards"""
+        self._flush_q_updates()
+        await self._persist_rewards()
+        self._last_flush = time.monotonic()
+    
     async def _generate_response_strategy(self, state: RLState, action_type: ActionType) -> str:
         """Generate specific response strategy based on state and action"""
         strategies = {
@@ -307,48 +594,46 @@ class ReinforcementLearningService:
         
         return min(1.0, base_level)
     
-    def _calculate_confidence(self, state: RLState, action_idx: int) -> float:
+    def _calculate_confidence(self, state_idx: int, action_idx: int) -> float:
         """Calculate confidence in action selection"""
-        state_idx = self.q_agent.state_to_index(state)
-        
         # Base confidence on Q-value and visit count
-        q_value = self.q_agent.q_table[state_idx, action_idx]
-        visit_count = self.q_agent.visit_count[state_idx, action_idx]
-        
-        # Higher confidence with more visits and higher Q-values
-        confidence = min(1.0, (q_value + 1) / 2 * np.log(visit_count + 1) / 5)
-        return max(0.1, confidence)  # Minimum confidence
+        return _confidence(
+            self.q_agent.q_table[state_idx, action_idx],
+            self.q_agent.visit_count[state_idx, action_idx]
+        )
     
     def _normalize_reward(self, reward: RLReward) -> float:
         """Normalize reward to 0-1 range"""
         # Different reward types have different scales
-        normalizers = {
-            RewardType.CUSTOMER_SATISFACTION: 1.0,  # Already 0-1
-            RewardType.RESPONSE_TIME: 0.5,  # Favor faster responses
-            RewardType.RESOLUTION_SUCCESS: 1.0,
-            RewardType.ESCALATION_AVOIDED: 0.8,
-            RewardType.FOLLOW_UP_REDUCED: 0.7
-        }
-        
-        multiplier = normalizers.get(reward.reward_type, 1.0)
+        multiplier = float(_NORM_LUT[_REWARD_CODES[reward.reward_type]])
         return min(1.0, reward.value * multiplier)
     
-    async def _persist_reward(self, reward: RLReward):
-        """Persist reward to database/cache"""
+    def _normalized_rewards(self, slots: np.ndarray) -> np.ndarray:
+        """Vectorized _normalize_reward over reward store slots"""
+        return np.minimum(1.0, self.rewards.values[slots] * _NORM_LUT[self.rewards.types[slots]])
+    
+    def _queue_reward(self, reward: RLReward):
+        """Stage a reward for the next batched persist"""
+        reward_key = f"rl_reward:{reward.customer_id}:{reward.session_id}:{reward.timestamp.timestamp()}"
+        # orjson encodes the enum and datetime fields natively
+        self._pending_rewards[reward_key] = asdict(reward)
+    
+    async def _persist_rewards(self):
+        """Persist queued rewards to cache in one pipelined round-trip"""
+        if not self._pending_rewards:
+            return
+        
         try:
             redis_client = await get_redis_client()
-            reward_key = f"rl_reward:{reward.customer_id}:{reward.session_id}:{reward.timestamp.timestamp()}"
-            reward_data = asdict(reward)
-            reward_data['timestamp'] = reward.timestamp.isoformat()
+            pending_rewards, self._pending_rewards = self._pending_rewards, {}
             
-            await redis_client.set(
-                reward_key, 
-                reward_data,
+            await redis_client.set_many(
+                pending_rewards,
                 expire=86400 * 30  # 30 days retention
             )
             
         except Exception as e:
-            logger.error(f"Error persisting reward: {e}")
+            logger.error(f"Error persisting rewards: {e}")
     
     async def _optimize_models(self):
         """Periodic model optimization"""
@@ -367,15 +652,15 @@ class ReinforcementLearningService:
     
     async def _calculate_reward_trends(self) -> Dict:
         """Calculate reward trends over time"""
-        if not self.rewards_history:
+        if not self.rewards.count:
             return {"trend": "no_data"}
         
-        # Simple trend calculation
-        recent_rewards = self.rewards_history[-50:] if len(self.rewards_history) >= 50 else self.rewards_history
-        recent_avg = np.mean([self._normalize_reward(r) for r in recent_rewards])
+        # Simple trend calculation over the last 100 rewards
+        normalized = self._normalized_rewards(self.rewards.recent_slots(100))
+        recent_avg = float(normalized[-50:].mean())
         
-        older_rewards = self.rewards_history[-100:-50] if len(self.rewards_history) >= 100 else []
-        older_avg = np.mean([self._normalize_reward(r) for r in older_rewards]) if older_rewards else recent_avg
+        older_rewards = normalized[:-50] if self.rewards.count >= 100 else normalized[:0]
+        older_avg = float(older_rewards.mean()) if older_rewards.size else recent_avg
         
         trend = "improving" if recent_avg > older_avg else "declining" if recent_avg < older_avg else "stable"
         
@@ -387,13 +672,11 @@ class ReinforcementLearningService:
     
     async def _get_action_distribution(self) -> Dict:
         """Get distribution of actions taken"""
-        action_counts = {}
-        for action_type in ActionType:
-            action_counts[action_type.value] = 0
-        
-        # Count from recent history (this is simplified - in production, 
-        # you'd track this more systematically)
-        return action_counts
+        # Maintained incrementally in provide_feedback
+        return {
+            action_type.value: int(self._action_counts[i])
+            for i, action_type in enumerate(self.action_mapping)
+        }
 
 # Global RL service instance
 rl_service = ReinforcementLearningService()
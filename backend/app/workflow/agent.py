@@ -5,105 +5,253 @@ Core 6-node workflow with basic logging
 
 import asyncio
 import logging
+import re
+import time
 from datetime import datetime
 from typing import Dict, Any, Optional
+from cachetools import TTLCache
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from app.services.customer import customer_service
+from app.services.cache import cache_service
 from app.services.classification import classification_service
 from app.services.rag import rag_service
 from app.services.graph import graph_service
 from app.services.intelligence import intelligence_service
-from app.services.reinforcement_learning import get_rl_service, RLState, RLReward, RewardType, ActionType
+from app.services.reinforcement_learning import get_rl_service, RLState, RLReward, RewardType
 from app.services.feedback_system import feedback_collector, generate_session_feedback
 from app.core.llm import llm_client
+from app.core.batching import BatchingProxy
+from app.core.database import SessionLocal
+from app.core.logging_context import SESSION_VAR
+from app.models.database import Customer
 from app.models.schemas import (
     CommunicationStyle, UrgencyLevel, RelationshipStage, 
     SentimentType, MessageType
 )
 
 
+# Enum values as plain strings, resolved once at import
+_CS_NEUTRAL = CommunicationStyle.NEUTRAL.value
+_CS_FORMAL = CommunicationStyle.FORMAL.value
+_CS_CASUAL = CommunicationStyle.CASUAL.value
+_CS_TECHNICAL = CommunicationStyle.TECHNICAL.value
+_URGENCY_LOW = UrgencyLevel.LOW.value
+_URGENCY_MEDIUM = UrgencyLevel.MEDIUM.value
+_URGENCY_HIGH = UrgencyLevel.HIGH.value
+
+
 class SimpleWorkflowState:
     """Simple state object for workflow"""
     
+    # Fixed attribute set; one instance is allocated per query
+    __slots__ = (
+        "customer_id", "session_id", "user_query", "_query_lower", "customer_profile",
+        "context_documents", "final_response", "start_ns", "db_session", "rl_state", "rl_action",
+        "sentiment_score", "communication_style", "_comm_style_s", "urgency_level", "_urgency_s", "keyword_mask", "_similar_task"
+    )
+    
     def __init__(self):
         self.customer_id: Optional[int] = None
         self.session_id: Optional[str] = None
         self.user_query: str = ""
+        self._query_lower: str = ""
         self.customer_profile: Dict[str, Any] = {}
         self.context_documents: list = []
         self.final_response: str = ""
-        self.start_time = datetime.now()
+        self.start_ns = time.perf_counter_ns()
         self.db_session = None
         # RL-specific attributes
         self.rl_state: Optional[RLState] = None
         self.rl_action = None
         self.sentiment_score: float = 0.0
         self.communication_style: CommunicationStyle = CommunicationStyle.NEUTRAL
+        self._comm_style_s: str = _CS_NEUTRAL
         self.urgency_level: UrgencyLevel = UrgencyLevel.MEDIUM
+        self._urgency_s: str = _URGENCY_MEDIUM
+        self.keyword_mask: int = 0
+        self._similar_task: Optional[asyncio.Task] = None
+
+
+# Keyword category bits for sentiment and urgency
+STRONG_NEGATIVE = 1 << 0
+MILD_NEGATIVE = 1 << 1
+POSITIVE = 1 << 2
+URGENT = 1 << 3
+REQUEST = 1 << 4
+
+# Lexical cues, matched as substrings in a single regex pass
+_KEYWORD_BITS = {
+    "frustrated": STRONG_NEGATIVE, "angry": STRONG_NEGATIVE, "terrible": STRONG_NEGATIVE, "awful": STRONG_NEGATIVE,
+    "annoyed": MILD_NEGATIVE, "problem": MILD_NEGATIVE, "issue": MILD_NEGATIVE,
+    "great": POSITIVE, "excellent": POSITIVE, "love": POSITIVE,
+    "urgent": URGENT, "immediately": URGENT, "asap": URGENT, "critical": URGENT,
+    "please": REQUEST, "help": REQUEST, "question": REQUEST,
+}
+_KEYWORD_RE = re.compile("|".join(sorted(_KEYWORD_BITS, key=len, reverse=True)))
+
+
+def _keyword_mask(query_lower: str) -> int:
+    """OR of the category bits of every sentiment/urgency keyword found in the query"""
+    mask = 0
+    for match in _KEYWORD_RE.findall(query_lower):
+        mask |= _KEYWORD_BITS[match]
+    return mask
+
+
+# RL-guided fallback responses keyed by (action type, urgency)
+_FALLBACK_RESPONSES = {
+    ("empathetic", "high"): "I can see this is really important to you, and I completely understand your urgency. Let me get you connected with someone who can provide immediate, personal assistance right away.",
+    ("empathetic", "medium"): "I hear you and want to make sure we address your concern properly. You're definitely in the right place for help.",
+    ("empathetic", "low"): "Thanks for reaching out - I appreciate you taking the time to contact us. Let's make sure we get this sorted out for you.",
+    ("technical", "high"): "I understand you need technical assistance urgently. Let me route you directly to our technical specialists who have the expertise to resolve this efficiently.",
+    ("technical", "medium"): "For your technical inquiry, I'll connect you with our technical support team who can provide detailed guidance and solutions.",
+    ("technical", "low"): "I see you have a technical question. Our technical support team will be able to provide you with comprehensive assistance.",
+    ("formal", "high"): "I acknowledge the urgent nature of your request. You will be connected with a senior specialist immediately to address this matter with the highest priority.",
+    ("formal", "medium"): "Thank you for your inquiry. I will ensure you are properly connected with the appropriate department to resolve your request.",
+    ("formal", "low"): "I appreciate you contacting us regarding this matter. A qualified representative will assist you with your request shortly.",
+    ("casual", "high"): "Hey, I can see this needs immediate attention! Let me get you connected with someone who can jump right on this for you.",
+    ("casual", "medium"): "Thanks for reaching out! Let's get you the help you need - I'll connect you with the right person.",
+    ("casual", "low"): "Hi there! Happy to help. Let me put you in touch with someone who can take great care of this for you.",
+    ("escalation", "high"): "I understand the critical nature of this issue. I'm immediately escalating this to our senior team for priority handling.",
+    ("escalation", "medium"): "I want to make sure this gets the attention it deserves. Let me connect you with a specialist who can provide comprehensive assistance.",
+    ("escalation", "low"): "To ensure you get the best possible resolution, I'm connecting you with a specialist who can give this proper focus.",
+}
+_DEFAULT_FALLBACK_RESPONSE = _FALLBACK_RESPONSES[("empathetic", "medium")]
+
+# Sentiment prefixes indexed by 1 + (sentiment > 0.5) - (sentiment < -0.5)
+_SENTIMENT_PREFIXES = ("I'm really sorry you're experiencing this issue. ", "", "I'm glad you reached out! ")
+
+# Greetings by communication style (others fall back to the neutral greeting)
+_GREETINGS = {
+    _CS_FORMAL: "Thank you for contacting our support team.",
+    _CS_CASUAL: "Hi there! Thanks for reaching out.",
+}
+_DEFAULT_GREETING = "Hello! I'm here to help."
+_URGENT_NOTE = " I understand this is urgent and I'll prioritize your request."
+_CLOSING = "Is there anything else I can help you with today?"
+
+# Generic fallback openings by communication style (high urgency overrides)
+_STYLE_FALLBACKS = {
+    _CS_TECHNICAL: "I'd be happy to help with your technical question. Let me get you connected with our technical support team.",
+    _CS_FORMAL: "Thank you for your inquiry. I will ensure you receive the proper assistance for your request.",
+}
+_URGENT_FALLBACK = "I understand this is urgent. Let me connect you with a specialist who can provide immediate assistance."
+_DEFAULT_STYLE_FALLBACK = "Thanks for reaching out! I want to make sure you get the best help possible."
+
+
+# System prompt for RL-guided responses; filled with one %-format per query
+_RL_CONTEXT_TEMPLATE = (
+    "You are a helpful customer support agent with AI-powered response optimization.\n"
+    "Customer communication style: %s\n"
+    "Query urgency: %s\n"
+    "Customer sentiment: %.1f (-1=negative, +1=positive)\n"
+    "Recommended response approach: %s\n"
+    "Response strategy: %s\n"
+    "Personalization level: %.1f (0=generic, 1=highly personalized)\n"
+    "%s"  # RL guidance line
+    "%s"  # Relevant documents
+    "Provide a helpful, accurate response following the recommended approach.\n"
+    "Adapt your response style based on the guidance above.\n"
+    "AI confidence in recommendation: %.1f"
+)
+
+# RL-specific guidance based on action type
+_RL_GUIDANCE = {
+    "empathetic": "GUIDANCE: Use empathetic language, acknowledge emotions, show understanding.\n",
+    "technical": "GUIDANCE: Provide detailed technical information, use precise terminology.\n",
+    "formal": "GUIDANCE: Maintain professional tone, use structured responses.\n",
+    "casual": "GUIDANCE: Use friendly, conversational tone, keep it simple.\n",
+    "escalation": "GUIDANCE: Prepare for escalation, gather all relevant information.\n",
+}
+
+
+# Recent (communication style, risk level) per customer for multi-turn sessions
+_CLASS_CACHE = TTLCache(maxsize=10_000, ttl=60)
+
+
+def _query_customers(customer_ids: list) -> Dict[int, Any]:
+    """Run the batched customer IN query on a dedicated session"""
+    db = SessionLocal()
+    try:
+        customers = db.query(Customer).filter(Customer.id.in_(customer_ids)).all()
+        return {customer.id: customer for customer in customers}
+    finally:
+        db.close()
+
+
+async def _load_customers_batch(customer_ids: list) -> Dict[int, Any]:
+    """Load every customer requested in one batching window with a single query"""
+    # The query is synchronous; keep it off the event loop so the batch doesn't stall it
+    return await asyncio.to_thread(_query_customers, customer_ids)
+
+
+# Concurrent process_query calls share customer lookups
+customer_loader = BatchingProxy(_load_customers_batch)
 
 
 class SimpleCustomerSupportAgent:
     """Simple customer support agent with 6-node workflow"""
     
     def __init__(self):
-        logger.info("🤖 Initializing Simple Customer Support Agent")
+        logger.info("agent.init")
+        # Strong references to fire-and-forget tasks until they finish
+        self._background_tasks: set = set()
     
     async def process_query(self, user_query: str, session_id: str = None, customer_id: int = None, db_session = None) -> Dict[str, Any]:
         """Process customer query through simple 6-node workflow"""
         
-        logger.info(f"🚀 Processing query: '{user_query[:50]}...'")
-        
         # Initialize state
         state = SimpleWorkflowState()
         state.user_query = user_query
-        state.session_id = session_id or f"session_{datetime.now().timestamp()}"
+        state._query_lower = user_query.lower()
+        state.session_id = session_id or f"session_{time.time_ns()}"
+        
+        # Bind the session to every log record emitted while handling this query
+        SESSION_VAR.set(state.session_id)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("workflow.start query=%r", user_query[:50])
         state.customer_id = customer_id
         state.db_session = db_session
         
         # Initialize feedback collection for this session
         feedback_collector.start_session(state.session_id)
-        feedback_collector.record_customer_message(state.session_id, user_query)
+        # Message analysis only feeds RL metrics; run it off the critical path
+        asyncio.get_running_loop().call_soon(feedback_collector.record_customer_message, state.session_id, user_query)
         
         try:
             # Node 1: Load Customer
-            logger.info("📋 Node 1: Loading customer...")
+            logger.info("node.load_customer.start")
             await self._load_customer(state)
             
-            # Node 2: Classify Customer
-            logger.info("🔍 Node 2: Classifying customer...")
-            await self._classify_customer(state)
+            # Node 4: Analyze Query (pure lexical scan, runs inline ahead of the I/O nodes)
+            logger.info("node.analyze_query.start")
+            self._analyze_query(state)
             
-            # Node 3: Get Context
-            logger.info("📚 Node 3: Getting context...")
-            await self._get_context(state)
-            
-            # Node 4: Analyze Query
-            logger.info("🤔 Node 4: Analyzing query...")
-            await self._analyze_query(state)
+            # Nodes 2 and 3 write disjoint profile keys, so their I/O overlaps
+            logger.info("node.classify_and_context.start")
+            await asyncio.gather(self._classify_customer(state), self._get_context(state))
             
             # Node 5: Generate Response
-            logger.info("🤖 Node 5: Generating response...")
+            logger.info("node.generate_response.start")
             await self._generate_response(state)
             
             # Node 6: Finalize
-            logger.info("✨ Node 6: Finalizing...")
+            logger.info("node.finalize.start")
             await self._finalize_response(state)
             
             # Record response time for feedback
             feedback_collector.record_agent_response_time(state.session_id)
             
             # Calculate execution time
-            execution_time = (datetime.now() - state.start_time).total_seconds()
+            execution_time = (time.perf_counter_ns() - state.start_ns) / 1e9
             
             # Generate automatic feedback for RL system
             if state.rl_state and state.rl_action:
-                asyncio.create_task(self._provide_automatic_feedback(state))
+                self._spawn(self._provide_automatic_feedback(state))
             
-            logger.info(f"✅ Workflow completed in {execution_time:.2f}s")
+            logger.info("workflow.done seconds=%.2f", execution_time)
             
             return {
                 "response": state.final_response,
@@ -114,25 +262,40 @@ class SimpleCustomerSupportAgent:
             }
             
         except Exception as e:
-            logger.error(f"❌ Workflow failed: {e}")
+            logger.error("workflow.failed error=%s", e)
+            if state._similar_task:
+                state._similar_task.cancel()
             return {
                 "response": "I apologize, but I'm having technical difficulties. Let me connect you with a human agent.",
                 "error": str(e),
                 "success": False
             }
     
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run auxiliary work in the background, keeping the task referenced until done"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
     async def _load_customer(self, state: SimpleWorkflowState):
         """Node 1: Load customer profile"""
         try:
             if state.customer_id:
-                customer = await customer_service.get_customer_by_id(state.customer_id, state.db_session)
+                # Repeat turns read the profile from Redis instead of the database
+                cached_profile = await cache_service.get_cached_customer_profile(state.customer_id)
+                if cached_profile:
+                    state.customer_profile = cached_profile
+                    logger.info("node.load_customer.cache_hit name=%s", cached_profile.get('name'))
+                    return
+                customer = await customer_loader.load(state.customer_id)
             elif state.session_id:
                 customer = await customer_service.get_customer_by_session(state.session_id, state.db_session)
             else:
                 # Create new customer
                 from app.models.schemas import CustomerCreate
                 new_customer = CustomerCreate(
-                    session_id=state.session_id or f"session_{datetime.now().timestamp()}",
+                    session_id=state.session_id or f"session_{time.time_ns()}",
                     name="Anonymous User"
                 )
                 customer = await customer_service.create_customer(new_customer, state.db_session)
@@ -146,23 +309,30 @@ class SimpleCustomerSupportAgent:
                     "communication_style": customer.communication_style,
                     "relationship_stage": customer.relationship_stage
                 }
-                logger.info(f"✅ Customer loaded: {customer.name}")
+                await cache_service.cache_customer_profile(customer.id, state.customer_profile)
+                logger.info("node.load_customer.done name=%s", customer.name)
             
         except Exception as e:
-            logger.error(f"Failed to load customer: {e}")
+            logger.error("Failed to load customer: %s", e)
             state.customer_profile = {"customer_id": None, "name": "Anonymous"}
     
     async def _classify_customer(self, state: SimpleWorkflowState):
         """Node 2: Classify customer behavior and communication style"""
         try:
             if state.customer_id:
-                classification = await classification_service.classify_customer_comprehensive(
-                    state.customer_id, state.db_session
-                )
-                
-                # Extract key insights
-                comm_style = classification.get("communication_style", {}).get("primary_style", CommunicationStyle.NEUTRAL.value)
-                risk_level = classification.get("risk_assessment", {}).get("risk_level", UrgencyLevel.LOW.value)
+                # Repeat turns within the TTL skip the classification queries
+                cached = _CLASS_CACHE.get(state.customer_id)
+                if cached:
+                    comm_style, risk_level = cached
+                else:
+                    classification = await classification_service.classify_customer_comprehensive(
+                        state.customer_id, state.db_session
+                    )
+                    
+                    # Extract key insights
+                    comm_style = classification.get("communication_style", {}).get("primary_style", _CS_NEUTRAL)
+                    risk_level = classification.get("risk_assessment", {}).get("risk_level", _URGENCY_LOW)
+                    _CLASS_CACHE[state.customer_id] = (comm_style, risk_level)
                 
                 state.customer_profile.update({
                     "communication_style": comm_style,
@@ -171,67 +341,83 @@ class SimpleCustomerSupportAgent:
                 
                 # Store for RL
                 state.communication_style = CommunicationStyle(comm_style)
+                state._comm_style_s = state.communication_style.value
                 
-                # Simple sentiment analysis for RL
-                query_lower = state.user_query.lower()
-                if any(word in query_lower for word in ["frustrated", "angry", "terrible", "awful"]):
+                # Simple sentiment analysis for RL (keywords scanned once in _analyze_query)
+                mask = state.keyword_mask
+                if mask & STRONG_NEGATIVE:
                     state.sentiment_score = -0.8
-                elif any(word in query_lower for word in ["annoyed", "problem", "issue"]):
+                elif mask & MILD_NEGATIVE:
                     state.sentiment_score = -0.3
-                elif any(word in query_lower for word in ["great", "excellent", "love"]):
+                elif mask & POSITIVE:
                     state.sentiment_score = 0.8
                 else:
                     state.sentiment_score = 0.0
                 
-                logger.info(f"✅ Customer classified: {comm_style} style, {risk_level} risk, sentiment: {state.sentiment_score}")
+                logger.info("node.classify.done style=%s risk=%s sentiment=%s", comm_style, risk_level, state.sentiment_score)
             
         except Exception as e:
-            logger.error(f"Classification failed: {e}")
-            state.customer_profile["communication_style"] = CommunicationStyle.NEUTRAL.value
+            logger.error("Classification failed: %s", e)
+            state.customer_profile["communication_style"] = _CS_NEUTRAL
     
     async def _get_context(self, state: SimpleWorkflowState):
         """Node 3: Get relevant context from documents and graph"""
         try:
+            # Get similar customers (if available and not already in the cached profile);
+            # only profile metadata depends on it, so the response doesn't wait for the graph query
+            if state.customer_id and "similar_customers" not in state.customer_profile:
+                state._similar_task = self._spawn(self._record_similar_customers(state))
+            
             # Get relevant documents
             docs = await rag_service.search_documents(
-                state.user_query, limit=3, db_session=state.db_session
+                state.user_query, limit=3, db=state.db_session
             )
             state.context_documents = docs
             
-            # Get similar customers (if available)
-            if state.customer_id:
-                similar = await graph_service.find_similar_customers(state.customer_id, limit=2)
-                state.customer_profile["similar_customers"] = len(similar)
-            
-            logger.info(f"✅ Context gathered: {len(docs)} documents")
+            logger.info("node.context.done documents=%s", len(docs))
             
         except Exception as e:
-            logger.error(f"Context gathering failed: {e}")
+            logger.error("Context gathering failed: %s", e)
             state.context_documents = []
     
-    async def _analyze_query(self, state: SimpleWorkflowState):
+    async def _record_similar_customers(self, state: SimpleWorkflowState):
+        """Look up similar customers and store the count in the cached profile for later turns"""
+        try:
+            similar = await graph_service.find_similar_customers(state.customer_id, limit=2)
+        except Exception as e:
+            logger.error("Similar customer lookup failed: %s", e)
+            return
+        # Add only the count to the cached profile; the live dict belongs to the response
+        # path and also holds per-query fields. Later turns read the count from the cache.
+        cached_profile = await cache_service.get_cached_customer_profile(state.customer_id)
+        if cached_profile is not None:
+            cached_profile["similar_customers"] = len(similar)
+            await cache_service.cache_customer_profile(state.customer_id, cached_profile)
+    
+    def _analyze_query(self, state: SimpleWorkflowState):
         """Node 4: Simple query analysis"""
         try:
             # Simple sentiment analysis
-            query_lower = state.user_query.lower()
-            
-            if any(word in query_lower for word in ["urgent", "immediately", "asap", "critical"]):
-                urgency = UrgencyLevel.HIGH.value
-            elif any(word in query_lower for word in ["frustrated", "angry", "terrible", "awful"]):
-                urgency = UrgencyLevel.HIGH.value
-            elif any(word in query_lower for word in ["please", "help", "question"]):
-                urgency = UrgencyLevel.MEDIUM.value
+            mask = state.keyword_mask = _keyword_mask(state._query_lower)
+            
+            if mask & URGENT:
+                urgency = _URGENCY_HIGH
+            elif mask & STRONG_NEGATIVE:
+                urgency = _URGENCY_HIGH
+            elif mask & REQUEST:
+                urgency = _URGENCY_MEDIUM
             else:
-                urgency = UrgencyLevel.LOW.value
+                urgency = _URGENCY_LOW
             
             state.customer_profile["urgency"] = urgency
             state.urgency_level = UrgencyLevel(urgency)
+            state._urgency_s = urgency
             
-            logger.info(f"✅ Query analyzed: {urgency} urgency")
+            logger.info("node.analyze_query.done urgency=%s", urgency)
             
         except Exception as e:
-            logger.error(f"Query analysis failed: {e}")
-            state.customer_profile["urgency"] = UrgencyLevel.MEDIUM.value
+            logger.error("Query analysis failed: %s", e)
+            state.customer_profile["urgency"] = _URGENCY_MEDIUM
     
     async def _generate_response(self, state: SimpleWorkflowState):
         """Node 5: Generate AI response using OpenAI with RL optimization"""
@@ -242,7 +428,7 @@ class SimpleCustomerSupportAgent:
                 urgency_level=state.urgency_level,
                 customer_sentiment=state.sentiment_score,
                 interaction_count=len(state.customer_profile.get("interaction_history", [])),
-                time_of_day=datetime.now().hour,
+                time_of_day=time.localtime().tm_hour,
                 issue_category="general",  # Could be enhanced with classification
                 customer_tier=state.customer_profile.get("tier", "regular")
             )
@@ -251,7 +437,7 @@ class SimpleCustomerSupportAgent:
             rl_service = await get_rl_service()
             state.rl_action = await rl_service.get_optimal_action(state.rl_state)
             
-            logger.info(f"🧠 RL recommends: {state.rl_action.action_type} (confidence: {state.rl_action.confidence:.2f})")
+            logger.info("rl.action action=%s confidence=%.2f", state.rl_action.action_type, state.rl_action.confidence)
             
             # Build context for AI with RL guidance
             context = self._build_context_for_ai_with_rl(state)
@@ -263,54 +449,40 @@ class SimpleCustomerSupportAgent:
                     {"role": "user", "content": state.user_query}
                 ]
                 
-                response = llm_client.generate_response(messages)
+                response = await llm_client.generate_response(messages)
                 if response:
                     state.final_response = response
-                    logger.info("✅ AI response generated with RL guidance")
+                    logger.info("node.generate_response.ai")
                     return
             
             # Fallback response with RL guidance
             state.final_response = self._generate_rl_guided_fallback_response(state)
-            logger.info("✅ RL-guided fallback response generated")
+            logger.info("node.generate_response.fallback")
             
         except Exception as e:
-            logger.error(f"Response generation failed: {e}")
+            logger.error("Response generation failed: %s", e)
             state.final_response = self._generate_fallback_response(state)
     
     async def _finalize_response(self, state: SimpleWorkflowState):
         """Node 6: Finalize and personalize response"""
         try:
             # Simple personalization based on customer profile
-            comm_style = state.customer_profile.get("communication_style", CommunicationStyle.NEUTRAL.value)
-            urgency = state.customer_profile.get("urgency", UrgencyLevel.MEDIUM.value)
+            comm_style = state.customer_profile.get("communication_style", _CS_NEUTRAL)
+            urgency = state.customer_profile.get("urgency", _URGENCY_MEDIUM)
             
             # Add greeting based on style
-            if comm_style == CommunicationStyle.FORMAL.value:
-                greeting = "Thank you for contacting our support team."
-            elif comm_style == CommunicationStyle.CASUAL.value:
-                greeting = "Hi there! Thanks for reaching out."
-            else:
-                greeting = "Hello! I'm here to help."
+            greeting = _GREETINGS.get(comm_style, _DEFAULT_GREETING)
             
             # Add urgency handling
-            if urgency == UrgencyLevel.HIGH.value:
-                urgency_note = " I understand this is urgent and I'll prioritize your request."
-            else:
-                urgency_note = ""
-            
-            # Combine final response
-            final_parts = [greeting + urgency_note, state.final_response]
+            urgency_note = _URGENT_NOTE if urgency == _URGENCY_HIGH else ""
             
-            # Add helpful closing
-            closing = "Is there anything else I can help you with today?"
-            final_parts.append(closing)
+            # Combine final response with a helpful closing
+            state.final_response = f"{greeting}{urgency_note}\n\n{state.final_response}\n\n{_CLOSING}"
             
-            state.final_response = "\n\n".join(final_parts)
-            
-            logger.info("✅ Response finalized and personalized")
+            logger.info("node.finalize.done")
             
         except Exception as e:
-            logger.error(f"Response finalization failed: {e}")
+            logger.error("Response finalization failed: %s", e)
             # Keep original response if finalization fails
     
     def _build_context_for_ai(self, state: SimpleWorkflowState) -> str:
@@ -339,17 +511,13 @@ class SimpleCustomerSupportAgent:
     def _generate_fallback_response(self, state: SimpleWorkflowState) -> str:
         """Generate simple fallback response when AI is not available"""
         
-        comm_style = state.customer_profile.get("communication_style", CommunicationStyle.NEUTRAL.value)
-        urgency = state.customer_profile.get("urgency", UrgencyLevel.MEDIUM.value)
+        comm_style = state.customer_profile.get("communication_style", _CS_NEUTRAL)
+        urgency = state.customer_profile.get("urgency", _URGENCY_MEDIUM)
         
-        if urgency == UrgencyLevel.HIGH.value:
-            base = "I understand this is urgent. Let me connect you with a specialist who can provide immediate assistance."
-        elif comm_style == CommunicationStyle.TECHNICAL.value:
-            base = "I'd be happy to help with your technical question. Let me get you connected with our technical support team."
-        elif comm_style == CommunicationStyle.FORMAL.value:
-            base = "Thank you for your inquiry. I will ensure you receive the proper assistance for your request."
+        if urgency == _URGENCY_HIGH:
+            base = _URGENT_FALLBACK
         else:
-            base = "Thanks for reaching out! I want to make sure you get the best help possible."
+            base = _STYLE_FALLBACKS.get(comm_style, _DEFAULT_STYLE_FALLBACK)
         
         return base + " A human agent will be with you shortly."
     
@@ -357,88 +525,38 @@ class SimpleCustomerSupportAgent:
         """Build context string for AI model with RL guidance"""
         
         rl_action = state.rl_action
-        context_parts = [
-            "You are a helpful customer support agent with AI-powered response optimization.",
-            f"Customer communication style: {state.communication_style.value}",
-            f"Query urgency: {state.urgency_level.value}",
-            f"Customer sentiment: {state.sentiment_score:.1f} (-1=negative, +1=positive)",
-            f"Recommended response approach: {rl_action.action_type.value}",
-            f"Response strategy: {rl_action.response_strategy}",
-            f"Personalization level: {rl_action.personalization_level:.1f} (0=generic, 1=highly personalized)"
-        ]
-        
-        # Add RL-specific guidance based on action type
-        if rl_action.action_type.value == "empathetic":
-            context_parts.append("GUIDANCE: Use empathetic language, acknowledge emotions, show understanding.")
-        elif rl_action.action_type.value == "technical":
-            context_parts.append("GUIDANCE: Provide detailed technical information, use precise terminology.")
-        elif rl_action.action_type.value == "formal":
-            context_parts.append("GUIDANCE: Maintain professional tone, use structured responses.")
-        elif rl_action.action_type.value == "casual":
-            context_parts.append("GUIDANCE: Use friendly, conversational tone, keep it simple.")
-        elif rl_action.action_type.value == "escalation":
-            context_parts.append("GUIDANCE: Prepare for escalation, gather all relevant information.")
         
         # Add document context if available
+        docs_block = ""
         if state.context_documents:
-            context_parts.append("Relevant information:")
-            for doc in state.context_documents[:2]:  # Top 2 docs
-                context_parts.append(f"- {doc.get('title', 'Document')}: {doc.get('content', '')[:200]}...")
+            docs_block = "Relevant information:\n%s\n" % "\n".join([
+                "- %s: %s..." % (doc.get('title', 'Document'), doc.get('content', '')[:200])
+                for doc in state.context_documents[:2]  # Top 2 docs
+            ])
         
-        context_parts.extend([
-            "Provide a helpful, accurate response following the recommended approach.",
-            "Adapt your response style based on the guidance above.",
-            f"AI confidence in recommendation: {rl_action.confidence:.1f}"
-        ])
-        
-        return "\n".join(context_parts)
+        return _RL_CONTEXT_TEMPLATE % (
+            state._comm_style_s,
+            state._urgency_s,
+            state.sentiment_score,
+            rl_action.action_type.value,
+            rl_action.response_strategy,
+            rl_action.personalization_level,
+            _RL_GUIDANCE.get(rl_action.action_type.value, ""),
+            docs_block,
+            rl_action.confidence
+        )
     
     def _generate_rl_guided_fallback_response(self, state: SimpleWorkflowState) -> str:
         """Generate RL-guided fallback response when AI is not available"""
         
         rl_action = state.rl_action
         action_type = rl_action.action_type.value
-        urgency = state.urgency_level.value
+        urgency = state._urgency_s
         sentiment = state.sentiment_score
         
-        # Base responses guided by RL action type
-        responses = {
-            "empathetic": {
-                "high": "I can see this is really important to you, and I completely understand your urgency. Let me get you connected with someone who can provide immediate, personal assistance right away.",
-                "medium": "I hear you and want to make sure we address your concern properly. You're definitely in the right place for help.",
-                "low": "Thanks for reaching out - I appreciate you taking the time to contact us. Let's make sure we get this sorted out for you."
-            },
-            "technical": {
-                "high": "I understand you need technical assistance urgently. Let me route you directly to our technical specialists who have the expertise to resolve this efficiently.",
-                "medium": "For your technical inquiry, I'll connect you with our technical support team who can provide detailed guidance and solutions.",
-                "low": "I see you have a technical question. Our technical support team will be able to provide you with comprehensive assistance."
-            },
-            "formal": {
-                "high": "I acknowledge the urgent nature of your request. You will be connected with a senior specialist immediately to address this matter with the highest priority.",
-                "medium": "Thank you for your inquiry. I will ensure you are properly connected with the appropriate department to resolve your request.",
-                "low": "I appreciate you contacting us regarding this matter. A qualified representative will assist you with your request shortly."
-            },
-            "casual": {
-                "high": "Hey, I can see this needs immediate attention! Let me get you connected with someone who can jump right on this for you.",
-                "medium": "Thanks for reaching out! Let's get you the help you need - I'll connect you with the right person.",
-                "low": "Hi there! Happy to help. Let me put you in touch with someone who can take great care of this for you."
-            },
-            "escalation": {
-                "high": "I understand the critical nature of this issue. I'm immediately escalating this to our senior team for priority handling.",
-                "medium": "I want to make sure this gets the attention it deserves. Let me connect you with a specialist who can provide comprehensive assistance.",
-                "low": "To ensure you get the best possible resolution, I'm connecting you with a specialist who can give this proper focus."
-            }
-        }
-        
         # Adjust based on sentiment
-        if sentiment < -0.5:  # Negative sentiment
-            prefix = "I'm really sorry you're experiencing this issue. "
-        elif sentiment > 0.5:  # Positive sentiment  
-            prefix = "I'm glad you reached out! "
-        else:
-            prefix = ""
-        
-        base_response = responses.get(action_type, responses["empathetic"]).get(urgency, responses["empathetic"]["medium"])
+        prefix = _SENTIMENT_PREFIXES[1 + (sentiment > 0.5) - (sentiment < -0.5)]
+        base_response = _FALLBACK_RESPONSES.get((action_type, urgency), _DEFAULT_FALLBACK_RESPONSE)
         
         return prefix + base_response
     
@@ -456,10 +574,10 @@ class SimpleCustomerSupportAgent:
                 
                 rl_service = await get_rl_service()
                 await rl_service.provide_feedback(state.rl_state, state.rl_action, reward)
-                logger.info(f"🔄 RL feedback provided: {satisfaction_score}")
+                logger.info("rl.feedback satisfaction=%s", satisfaction_score)
                 
         except Exception as e:
-            logger.error(f"Failed to provide RL feedback: {e}")
+            logger.error("Failed to provide RL feedback: %s", e)
     
     async def _provide_automatic_feedback(self, state: SimpleWorkflowState):
         """
@@ -470,42 +588,37 @@ class SimpleCustomerSupportAgent:
             # Get session metrics
             metrics = feedback_collector.get_session_metrics(state.session_id)
             if not metrics:
-                logger.warning(f"No metrics available for session {state.session_id}")
+                logger.warning("rl.auto_feedback.no_metrics")
                 return
             
             # Generate multiple reward signals
             rewards = await generate_session_feedback(state.session_id)
             
-            # Provide each reward to the RL system
-            rl_service = await get_rl_service()
-            for reward in rewards:
-                if state.rl_state and state.rl_action:
-                    # Provide feedback with the original state and action
-                    await rl_service.provide_feedback(state.rl_state, state.rl_action, reward)
-                    logger.info(f"🔄 Auto-feedback: {reward.reward_type.value} = {reward.value:.2f}")
+            if not (state.rl_state and state.rl_action and rewards):
+                return
             
             # Simulate next state for Q-learning (simplified)
-            if state.rl_state and len(rewards) > 0:
-                # Create a "next state" representing the post-interaction state
-                next_state = RLState(
-                    communication_style=state.rl_state.communication_style,
-                    urgency_level=UrgencyLevel.LOW,  # Assume resolved
-                    customer_sentiment=max(-1.0, state.rl_state.customer_sentiment + 0.2),  # Slight improvement
-                    interaction_count=state.rl_state.interaction_count + 1,
-                    time_of_day=state.rl_state.time_of_day,
-                    issue_category=state.rl_state.issue_category,
-                    customer_tier=state.rl_state.customer_tier
-                )
-                
-                # Update Q-learning with state transition
-                best_reward = max(rewards, key=lambda r: r.value)
-                action_idx = list(ActionType).index(state.rl_action.action_type)
-                rl_service.q_agent.update(state.rl_state, action_idx, best_reward.value, next_state)
-                
-                logger.info(f"🧠 Q-learning updated with transition reward: {best_reward.value:.2f}")
+            # Create a "next state" representing the post-interaction state
+            next_state = RLState(
+                communication_style=state.rl_state.communication_style,
+                urgency_level=UrgencyLevel.LOW,  # Assume resolved
+                customer_sentiment=max(-1.0, state.rl_state.customer_sentiment + 0.2),  # Slight improvement
+                interaction_count=state.rl_state.interaction_count + 1,
+                time_of_day=state.rl_state.time_of_day,
+                issue_category=state.rl_state.issue_category,
+                customer_tier=state.rl_state.customer_tier
+            )
+            
+            # Provide every reward with the original state and action, plus one
+            # Q-learning transition on the best reward, in a single call
+            rl_service = await get_rl_service()
+            await rl_service.provide_feedback_batch(state.rl_state, state.rl_action, rewards, next_state)
+            
+            logger.info("rl.auto_feedback rewards=%d best=%.2f",
+                        len(rewards), max(reward.value for reward in rewards))
                 
         except Exception as e:
-            logger.error(f"Failed to provide automatic feedback: {e}")
+            logger.error("Failed to provide automatic feedback: %s", e)
 
 
 # Global instance
@@ -4,7 +4,7 @@ No complex monitoring, just essential functionality
 """
 
 import logging
-from datetime import datetime
+import time
 from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
@@ -14,7 +14,7 @@ class SimpleWorkflowLogger:
     
     def __init__(self):
         self.execution_count = 0
-        self.start_time = datetime.now()
+        self.start_ns = time.monotonic_ns()
         logger.info("Simple workflow logger initialized")
     
     def log_execution(self, result: Dict[str, Any]):
@@ -25,13 +25,13 @@ class SimpleWorkflowLogger:
         execution_time = result.get("execution_time", 0)
         
         if success:
-            logger.info(f"✅ Workflow #{self.execution_count} completed in {execution_time:.2f}s")
+            logger.info("✅ Workflow #%s completed in %.2fs", self.execution_count, execution_time)
         else:
-            logger.error(f"❌ Workflow #{self.execution_count} failed: {result.get('error', 'Unknown error')}")
+            logger.error("❌ Workflow #%s failed: %s", self.execution_count, result.get('error', 'Unknown error'))
     
     def get_simple_stats(self) -> Dict[str, Any]:
         """Get basic execution statistics"""
-        uptime = (datetime.now() - self.start_time).total_seconds()
+        uptime = (time.monotonic_ns() - self.start_ns) / 1e9
         
         return {
             "total_executions": self.execution_count,
@@ -10,15 +10,16 @@ This runs as a separate process to handle:
 
 import asyncio
 import logging
+import os
+import random
 import signal
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
 
 # Add parent directory to Python path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.services.etl import etl_service
-from app.core.config import settings
 
 # Configure logging
 logging.basicConfig(
@@ -27,17 +28,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rows per write batch passed to the ETL service
+BATCH_SIZE = int(os.environ.get("ETL_BATCH_SIZE", "1000"))
+# Documents processed concurrently during a knowledge base sync
+CONCURRENCY = int(os.environ.get("ETL_CONCURRENCY", "8"))
+# Redis key holding the start time of the last successful incremental sync
+WATERMARK_KEY = "etl:incremental_watermark"
+# Seconds stop() lets an in-flight sync finish before cancelling it
+STOP_TIMEOUT = 15
+
 class ETLWorker:
     """Background ETL processing worker"""
     
     def __init__(self):
-        self.running = False
         self.tasks = []
+        # Set once by stop(); the sync loops exit as soon as they see it
+        self._shutdown = asyncio.Event()
+        self.connected = False
+        self.etl = None
+        # Keeps the two sync loops from writing to the databases at the same time
+        self._write_lock = asyncio.Lock()
+        # Set to wake the sync loops early (shutdown or an on-demand sync)
+        self._wake_event = asyncio.Event()
     
     async def start(self):
         """Start the ETL worker"""
         logger.info("🚀 Starting ETL Worker...")
-        self.running = True
+        
+        # The ETL service pulls in SQLAlchemy, Neo4j and the RAG stack; import it here
+        # so the process is up (and its signal handlers installed) before that cost
+        from app.services.etl import etl_service
+        from app.core.neo4j_client import neo4j_client
+        from app.core.redis_client import redis_client
+        self.etl = etl_service
+        
+        # Open the process-wide Redis pool and Neo4j driver once; every sync reuses them
+        await redis_client.connect()
+        neo4j_client.connect()
+        self.connected = True
         
         # Schedule background tasks
         self.tasks = [
@@ -51,17 +79,48 @@ class ETLWorker:
         except asyncio.CancelledError:
             logger.info("📋 ETL Worker tasks cancelled")
     
+    def wake(self):
+        """Trigger the sync loops now instead of at their next interval"""
+        self._wake_event.set()
+    
+    async def _wait_for_wake(self, timeout: float) -> bool:
+        """Sleep until the interval elapses or the worker is woken; True once shutting down"""
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        if self._shutdown.is_set():
+            return True
+        self._wake_event.clear()
+        return False
+    
     async def stop(self):
         """Stop the ETL worker gracefully"""
         logger.info("🛑 Stopping ETL Worker...")
-        self.running = False
+        # The loops check the shutdown event between syncs, so an in-flight sync finishes
+        self._shutdown.set()
+        self._wake_event.set()
         
-        # Cancel all tasks
-        for task in self.tasks:
-            task.cancel()
+        if self.tasks:
+            _, pending = await asyncio.wait(self.tasks, timeout=STOP_TIMEOUT)
+            # Only a sync still running after the grace period is cancelled
+            for task in pending:
+                logger.warning("⚠️ Task %s did not exit in %ss, cancelling", task.get_name(), STOP_TIMEOUT)
+                task.cancel()
+            if pending:
+                _, stuck = await asyncio.wait(pending, timeout=5)
+                for task in stuck:
+                    logger.error("❌ Task %s ignored cancellation", task.get_name())
         
-        # Wait for tasks to complete cancellation
-        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.connected:
+            from app.core.database import engine
+            from app.core.neo4j_client import neo4j_client
+            from app.core.redis_client import redis_client
+            
+            self.connected = False
+            await redis_client.close()
+            neo4j_client.close()
+            engine.dispose()
         logger.info("✅ ETL Worker stopped")
     
     async def _knowledge_base_sync_loop(self):
@@ -70,65 +129,89 @@ class ETLWorker:
         
         # Initial sync
         try:
-            result = await etl_service.sync_knowledge_base()
-            if result.get("synced_documents", 0) > 0:
-                logger.info(f"✅ Initial knowledge sync: {result['synced_documents']} documents")
+            async with self._write_lock:
+                result = await self.etl.sync_knowledge_base(batch_size=BATCH_SIZE, concurrency=CONCURRENCY)
+            synced = result.get("synced_documents", 0)
+            if synced:
+                logger.info("✅ Initial knowledge sync: %d documents", synced)
         except Exception as e:
-            logger.error(f"❌ Initial knowledge sync failed: {e}")
+            logger.error("❌ Initial knowledge sync failed: %s", e)
         
         # Periodic sync every 30 minutes
-        while self.running:
+        delay = 30 * 60  # 30 minutes
+        backoff = 1.0
+        while not self._shutdown.is_set():
             try:
-                await asyncio.sleep(30 * 60)  # 30 minutes
-                
-                if not self.running:
+                if await self._wait_for_wake(delay):
                     break
                 
                 logger.info("🔄 Running scheduled knowledge base sync...")
-                result = await etl_service.sync_knowledge_base()
+                async with self._write_lock:
+                    result = await self.etl.sync_knowledge_base(batch_size=BATCH_SIZE, concurrency=CONCURRENCY)
                 
                 if "error" in result:
-                    logger.warning(f"⚠️ Knowledge sync issue: {result['error']}")
+                    logger.warning("⚠️ Knowledge sync issue: %s", result['error'])
                 else:
-                    logger.info(f"✅ Knowledge sync: {result.get('synced_documents', 0)} documents")
+                    synced = result.get("synced_documents", 0)
+                    if synced:
+                        logger.info("✅ Knowledge sync: %d documents", synced)
+                delay = 30 * 60
+                backoff = 1.0
                     
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"❌ Knowledge sync loop error: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute before retry
+                logger.error("❌ Knowledge sync loop error: %s", e)
+                # Retry with exponential back-off and jitter, capped at 5 minutes
+                delay = backoff + random.uniform(0, backoff * 0.1)
+                backoff = min(backoff * 2, 300)
     
     async def _incremental_sync_loop(self):
         """Background loop for incremental data synchronization"""
         logger.info("📊 Starting incremental sync loop...")
         
-        # Wait a bit before starting incremental syncs
-        await asyncio.sleep(60)
+        # Wait a bit (with jitter) before starting incremental syncs so the
+        # two loops' ticks don't line up
+        if await self._wait_for_wake(60 + random.uniform(0, 60)):
+            return
         
         # Incremental sync every 10 minutes
-        while self.running:
+        delay = 10 * 60  # 10 minutes
+        backoff = 1.0
+        while not self._shutdown.is_set():
             try:
-                await asyncio.sleep(10 * 60)  # 10 minutes
-                
-                if not self.running:
+                if await self._wait_for_wake(delay):
                     break
                 
                 logger.info("🔄 Running incremental data sync...")
-                result = await etl_service.incremental_sync()
+                # Only scan rows changed since the last successful run
+                watermark = await self.etl.cache.redis.get(WATERMARK_KEY)
+                since = datetime.fromisoformat(watermark) if watermark else None
+                if since and since.tzinfo is None:
+                    # Watermarks written before they carried an offset were UTC
+                    since = since.replace(tzinfo=timezone.utc)
+                sync_started = datetime.now(timezone.utc)
+                async with self._write_lock:
+                    result = await self.etl.incremental_sync(since=since, batch_size=BATCH_SIZE)
                 
                 if "error" in result:
-                    logger.warning(f"⚠️ Incremental sync issue: {result['error']}")
+                    logger.warning("⚠️ Incremental sync issue: %s", result['error'])
                 else:
                     customers = result.get('customers_synced', 0)
                     conversations = result.get('conversations_synced', 0)
-                    if customers > 0 or conversations > 0:
-                        logger.info(f"✅ Incremental sync: {customers} customers, {conversations} conversations")
+                    if customers or conversations:
+                        logger.info("✅ Incremental sync: %d customers, %d conversations", customers, conversations)
+                    await self.etl.cache.redis.set(WATERMARK_KEY, sync_started.isoformat())
+                delay = 10 * 60
+                backoff = 1.0
                     
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"❌ Incremental sync loop error: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute before retry
+                logger.error("❌ Incremental sync loop error: %s", e)
+                # Retry with exponential back-off and jitter, capped at 5 minutes
+                delay = backoff + random.uniform(0, backoff * 0.1)
+                backoff = min(backoff * 2, 300)
 
 # Global worker instance
 worker = ETLWorker()
@@ -136,14 +219,19 @@ worker = ETLWorker()
 async def main():
     """Main entry point for ETL worker"""
     
-    def signal_handler(signum, frame):
+    loop = asyncio.get_running_loop()
+    stop_tasks = set()
+    
+    def signal_handler(signum):
         """Handle shutdown signals"""
-        logger.info(f"📋 Received signal {signum}, initiating shutdown...")
-        asyncio.create_task(worker.stop())
+        logger.info("📋 Received signal %s, initiating shutdown...", signum)
+        task = loop.create_task(worker.stop())
+        stop_tasks.add(task)
+        task.add_done_callback(stop_tasks.discard)
     
-    # Register signal handlers
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    # Register signal handlers on the running loop
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, signal_handler, signum)
     
     try:
         await worker.start()
@@ -7,11 +7,11 @@ for proper production deployment.
 """
 
 import asyncio
-import subprocess
 import signal
 import sys
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Configure logging
@@ -21,6 +21,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _cpu_sets():
+    """Split the usable cores into disjoint sets: half for the API, a quarter each for ETL and MCP"""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    # Only the CPUs this process may run on (containers, taskset), which need not be 0..n-1
+    cpus = sorted(os.sched_getaffinity(0))
+    cpu_count = len(cpus)
+    if cpu_count < 4:
+        return None
+    api_end = cpu_count // 2
+    etl_end = api_end + cpu_count // 4
+    return {
+        "api": set(cpus[:api_end]),
+        "etl": set(cpus[api_end:etl_end]),
+        "mcp": set(cpus[etl_end:]),
+    }
+
+
+# One writer thread keeps console writes off the event loop and in order
+_output_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="output")
+
+
+def _write_output(text: str):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+# Child output lines longer than this are passed through in pieces
+PUMP_LINE_LIMIT = 1024 * 1024
+
+
+async def _pump(stream, prefix: str):
+    """Copy a child's output to ours line by line, tagged with the process name
+    
+    Keeps draining through over-long lines so a child never blocks on a full pipe.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                chunk = await stream.readuntil(b"\n")
+            except asyncio.LimitOverrunError as e:
+                # No newline within the limit: forward what is buffered and carry on
+                chunk = await stream.read(max(e.consumed, 1))
+            except asyncio.IncompleteReadError as e:
+                chunk = e.partial  # EOF; forward any unterminated last line
+                if not chunk:
+                    break
+            text = chunk.decode(errors='replace')
+            if not text.endswith("\n"):
+                text += "\n"
+            await loop.run_in_executor(_output_executor, _write_output, f"[{prefix}] {text}")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error("❌ Output pump for %s stopped: %s", prefix, e)
+
+
 class SystemManager:
     """Manages API server, ETL worker, and MCP server processes"""
     
@@ -29,6 +88,53 @@ class SystemManager:
         self.etl_process = None
         self.mcp_process = None
         self.running = False
+        self.cpu_sets = _cpu_sets()
+        self.pumps = []
+    
+    def _child_env(self, role: str):
+        """Environment for a child, with thread pools sized to its CPU set"""
+        env = os.environ.copy()
+        # Children write to a pipe; unbuffered output keeps their lines prompt
+        env["PYTHONUNBUFFERED"] = "1"
+        if self.cpu_sets:
+            threads = str(len(self.cpu_sets[role]))
+            env["OMP_NUM_THREADS"] = threads
+            env["MKL_NUM_THREADS"] = threads
+        return env
+    
+    def _api_server_options(self):
+        """uvicorn flags: multi-worker uvloop in production, auto-reload otherwise"""
+        if os.environ.get("ENV") != "prod":
+            return ["--reload"]
+        workers = len(self.cpu_sets["api"]) if self.cpu_sets else (os.cpu_count() or 1)
+        return ["--workers", str(workers), "--loop", "uvloop", "--http", "httptools"]
+    
+    async def _spawn(self, role: str, *args, pipe_output: bool = True):
+        """Start a child, piping its output through a prefixing pump"""
+        output = asyncio.subprocess.PIPE if pipe_output else None
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=output,
+            stderr=asyncio.subprocess.STDOUT if pipe_output else None,
+            env=self._child_env(role),
+            limit=PUMP_LINE_LIMIT,
+            # Our fds are non-inheritable anyway (PEP 446); leaving close_fds off
+            # lets subprocess launch via posix_spawn instead of fork+exec
+            close_fds=False
+        )
+        if pipe_output:
+            self.pumps.append(asyncio.create_task(_pump(process.stdout, role)))
+        self._pin(role, process)
+        return process
+    
+    def _pin(self, role: str, process):
+        """Pin a child process to its CPU set so it doesn't share cores with the others"""
+        if not self.cpu_sets:
+            return
+        try:
+            os.sched_setaffinity(process.pid, self.cpu_sets[role])
+        except OSError as e:
+            logger.warning("⚠️ Could not set CPU affinity for %s: %s", role, e)
     
     async def start(self):
         """Start both API server and ETL worker"""
@@ -38,31 +144,29 @@ class SystemManager:
         try:
             # Start API server
             logger.info("📡 Starting API Server...")
-            self.api_process = subprocess.Popen([
+            self.api_process = await self._spawn(
+                "api",
                 sys.executable, "-m", "uvicorn", 
                 "app.main:app", 
                 "--host", "0.0.0.0", 
                 "--port", "8000",
-                "--reload"
-            ])
+                *self._api_server_options()
+            )
             
             # Wait a moment for API to start
             await asyncio.sleep(2)
             
             # Start ETL worker
             logger.info("⚙️ Starting ETL Worker...")
-            self.etl_process = subprocess.Popen([
-                sys.executable, "etl_worker/main.py"
-            ])
+            self.etl_process = await self._spawn("etl", sys.executable, "etl_worker/main.py")
             
             # Wait a moment for ETL to start
             await asyncio.sleep(1)
             
             # Start MCP server
             logger.info("🤖 Starting MCP Server...")
-            self.mcp_process = subprocess.Popen([
-                sys.executable, "app/mcp_server.py"
-            ])
+            # FastMCP speaks its protocol over stdio, so its streams are left untouched
+            self.mcp_process = await self._spawn("mcp", sys.executable, "app/mcp_server.py", pipe_output=False)
             
             logger.info("✅ System started successfully!")
             logger.info("   📡 API Server: http://localhost:8000")
@@ -75,7 +179,7 @@ class SystemManager:
             await self._monitor_processes()
             
         except Exception as e:
-            logger.error(f"❌ System startup failed: {e}")
+            logger.error("❌ System startup failed: %s", e)
             await self.stop()
     
     async def stop(self):
@@ -84,67 +188,68 @@ class SystemManager:
         self.running = False
         
         # Stop MCP server first
-        if self.mcp_process:
+        if self.mcp_process and self.mcp_process.returncode is None:
             logger.info("🤖 Stopping MCP Server...")
             self.mcp_process.terminate()
             try:
-                self.mcp_process.wait(timeout=10)
+                await asyncio.wait_for(self.mcp_process.wait(), timeout=10)
                 logger.info("✅ MCP Server stopped")
-            except subprocess.TimeoutExpired:
+            except asyncio.TimeoutError:
                 logger.warning("⚠️ MCP Server force killed")
                 self.mcp_process.kill()
         
         # Stop ETL worker
-        if self.etl_process:
+        if self.etl_process and self.etl_process.returncode is None:
             logger.info("⚙️ Stopping ETL Worker...")
             self.etl_process.terminate()
             try:
-                self.etl_process.wait(timeout=10)
+                # Longer than the worker's own grace period for an in-flight sync
+                await asyncio.wait_for(self.etl_process.wait(), timeout=25)
                 logger.info("✅ ETL Worker stopped")
-            except subprocess.TimeoutExpired:
+            except asyncio.TimeoutError:
                 logger.warning("⚠️ ETL Worker force killed")
                 self.etl_process.kill()
         
         # Stop API server last
-        if self.api_process:
+        if self.api_process and self.api_process.returncode is None:
             logger.info("📡 Stopping API Server...")
             self.api_process.terminate()
             try:
-                self.api_process.wait(timeout=10)
+                await asyncio.wait_for(self.api_process.wait(), timeout=10)
                 logger.info("✅ API Server stopped")
-            except subprocess.TimeoutExpired:
+            except asyncio.TimeoutError:
                 logger.warning("⚠️ API Server force killed")
                 self.api_process.kill()
         
+        # Let the pumps drain whatever the children wrote before exiting
+        if self.pumps:
+            await asyncio.wait(self.pumps, timeout=5)
+        
         logger.info("✅ System shutdown complete")
     
     async def _monitor_processes(self):
-        """Monitor all processes and restart if needed"""
-        while self.running:
-            try:
-                # Check API process
-                if self.api_process.poll() is not None:
-                    logger.error(f"❌ API Server crashed! Exit code: {self.api_process.returncode}")
-                    self.running = False
-                    break
-                
-                # Check ETL process
-                if self.etl_process.poll() is not None:
-                    logger.error(f"❌ ETL Worker crashed! Exit code: {self.etl_process.returncode}")
-                    self.running = False
-                    break
-                
-                # Check MCP process
-                if self.mcp_process.poll() is not None:
-                    logger.error(f"❌ MCP Server crashed! Exit code: {self.mcp_process.returncode}")
-                    self.running = False
-                    break
-                
-                await asyncio.sleep(5)  # Check every 5 seconds
-                
-            except Exception as e:
-                logger.error(f"❌ Process monitoring error: {e}")
-                break
+        """Wait for the first process to exit and report it"""
+        processes = {
+            "API Server": self.api_process,
+            "ETL Worker": self.etl_process,
+            "MCP Server": self.mcp_process,
+        }
+        waiters = {
+            asyncio.create_task(process.wait(), name=name)
+            for name, process in processes.items()
+        }
+        try:
+            done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            if self.running:
+                for task in done:
+                    name = task.get_name()
+                    logger.error("❌ %s crashed! Exit code: %s", name, processes[name].returncode)
+            self.running = False
+        except Exception as e:
+            logger.error("❌ Process monitoring error: %s", e)
+        finally:
+            for task in waiters:
+                task.cancel()
 
 # Global system manager
 system_manager = SystemManager()
@@ -152,14 +257,19 @@ system_manager = SystemManager()
 async def main():
     """Main entry point"""
     
-    def signal_handler(signum, frame):
+    loop = asyncio.get_running_loop()
+    stop_tasks = set()
+    
+    def signal_handler(signum):
         """Handle shutdown signals"""
-        logger.info(f"📋 Received signal {signum}, shutting down system...")
-        asyncio.create_task(system_manager.stop())
+        logger.info("📋 Received signal %s, shutting down system...", signum)
+        task = loop.create_task(system_manager.stop())
+        stop_tasks.add(task)
+        task.add_done_callback(stop_tasks.discard)
     
-    # Register signal handlers
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    # Register signal handlers on the running loop
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, signal_handler, signum)
     
     try:
         await system_manager.start()
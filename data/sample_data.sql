@@ -22,19 +22,29 @@ INSERT INTO conversations (customer_id, session_id, topic, status, priority, sum
 (4, 'session_004', 'Cancellation Request', 'resolved', 'critical', 'Customer dissatisfied with service quality');
 
 -- Sample messages for conversations
-INSERT INTO messages (conversation_id, content, message_type, intent, sentiment) VALUES
-(1, 'Hi, I need to update my payment method', 'user', 'request', 'neutral'),
-(1, 'I can help you update your payment method. Please go to Account Settings > Billing.', 'assistant', 'response', 'positive'),
-(1, 'Perfect, thank you!', 'user', 'gratitude', 'positive'),
+INSERT INTO messages (conversation_id, customer_id, content, message_type, intent, sentiment) VALUES
+(1, 1, 'Hi, I need to update my payment method', 'user', 'request', 'neutral'),
+(1, 1, 'I can help you update your payment method. Please go to Account Settings > Billing.', 'assistant', 'response', 'positive'),
+(1, 1, 'Perfect, thank you!', 'user', 'gratitude', 'positive'),
 
-(2, 'Do you have an API for integrations?', 'user', 'question', 'neutral'),
-(2, 'Yes! We offer a comprehensive REST API. Would you like me to send you the documentation?', 'assistant', 'response', 'positive'),
+(2, 2, 'Do you have an API for integrations?', 'user', 'question', 'neutral'),
+(2, 2, 'Yes! We offer a comprehensive REST API. Would you like me to send you the documentation?', 'assistant', 'response', 'positive'),
 
-(3, 'The API integration is failing with error 500', 'user', 'complaint', 'negative'),
-(3, 'I apologize for the issue. Let me escalate this to our technical team immediately.', 'assistant', 'response', 'neutral'),
+(3, 3, 'The API integration is failing with error 500', 'user', 'complaint', 'negative'),
+(3, 3, 'I apologize for the issue. Let me escalate this to our technical team immediately.', 'assistant', 'response', 'neutral'),
 
-(4, 'I want to cancel my subscription', 'user', 'request', 'negative'),
-(4, 'I understand your concern. Let me help you with the cancellation process and see if we can address any issues.', 'assistant', 'response', 'neutral');
+(4, 4, 'I want to cancel my subscription', 'user', 'request', 'negative'),
+(4, 4, 'I understand your concern. Let me help you with the cancellation process and see if we can address any issues.', 'assistant', 'response', 'neutral');
+
+-- Summary fields maintained incrementally by the application
+UPDATE conversations c SET
+    message_count = (SELECT count(*) FROM messages m WHERE m.conversation_id = c.id),
+    first_user_msg = (SELECT left(m.content, 100) FROM messages m
+                      WHERE m.conversation_id = c.id AND m.message_type = 'user'
+                      ORDER BY m.id LIMIT 1),
+    last_assistant_msg = (SELECT left(m.content, 100) FROM messages m
+                          WHERE m.conversation_id = c.id AND m.message_type = 'assistant'
+                          ORDER BY m.id DESC LIMIT 1);
 
 -- Sample interaction records
 INSERT INTO interactions (customer_id, interaction_type, channel, outcome, response_time_seconds, resolution_time_seconds) VALUES
@@ -48,4 +58,11 @@ INSERT INTO conversation_memory (customer_id, memory_type, content, importance,
 (1, 'preference', 'Prefers email notifications over SMS', 0.7, 1, 'notification,preference'),
 (2, 'context', 'Software developer interested in API integrations', 0.9, 2, 'developer,api,integration'),
 (3, 'issue', 'Has complex enterprise integration requirements', 0.8, 3, 'enterprise,integration,technical'),
-(4, 'note', 'Customer expressed frustration with recent service changes', 0.6, 4, 'feedback,service,frustration');
\ No newline at end of file
+(4, 'note', 'Customer expressed frustration with recent service changes', 0.6, 4, 'feedback,service,frustration');
+
+-- Normalized memory tags
+INSERT INTO memory_tags (memory_id, tag)
+SELECT DISTINCT cm.id, trim(t.tag)
+FROM conversation_memory cm
+CROSS JOIN LATERAL unnest(string_to_array(cm.tags, ',')) AS t(tag)
+WHERE cm.tags IS NOT NULL AND trim(t.tag) <> '';
@@ -47,6 +47,8 @@ else
     podman network create customer-support-network 2>/dev/null || true
     
     # Start databases first
+    # pgvector >= 0.8 is required for hnsw.iterative_scan. A data volume created by the
+    # old pg15 image must be dumped and restored first (see README, "Upgrading PostgreSQL")
     echo "🗄️  Starting PostgreSQL..."
     podman run -d \
         --name customer-support-postgres \
@@ -60,7 +62,7 @@ else
         --health-interval=10s \
         --health-timeout=5s \
         --health-retries=5 \
-        postgres:15
+        docker.io/pgvector/pgvector:0.8.0-pg16
     
     echo "📊 Starting Neo4j..."
     podman run -d \